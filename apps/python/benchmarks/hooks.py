@@ -0,0 +1,120 @@
+"""Per-request extension hook overhead (two hooks), before and after precompiled dispatch.
+
+Run from apps/python:  python benchmarks/hooks.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from cromio import Server  # noqa: E402
+from cromio.extensions.utils import BaseExtension, Extensions  # noqa: E402
+
+
+class LegacyExtensions(Extensions):
+    # What trigger_hook used to do on every call
+    def trigger_hook(self, name, context={}):
+        for ext in self.extensions:
+            hook = getattr(ext, name, None)
+            if callable(hook):
+                hook(dict(context))
+
+
+class NoopExtension(BaseExtension):
+    pass
+
+
+class CountingExtension(BaseExtension):
+    def __init__(self):
+        self.calls = 0
+
+    def on_request_begin(self, context):
+        self.calls += 1
+
+    def on_request_end(self, context):
+        self.calls += 1
+
+
+def legacy_request(server, credentials, payload):
+    # Two hooks per request, each with its own freshly built request dict
+    server.extensions.trigger_hook("on_request_begin", {
+        "request": {
+            "trigger": "add",
+            "body": payload,
+            "client": {"ip": credentials.get("ip"), "language": credentials.get("language")}
+        },
+        "server": server
+    })
+    server.extensions.trigger_hook("on_request_end", {
+        "request": {
+            "trigger": "add",
+            "client": {"ip": credentials.get("ip"), "language": credentials.get("language")},
+            "body": payload,
+        },
+        "server": server,
+        "response": {"status": 200, "data": 3, "performance": {"size": 10, "time": 0.0}}
+    })
+
+
+def current_request(server, credentials, payload):
+    # The request dict is built at most once per call, and only if a hook needs it
+    request = None
+    if server.extensions.has_hook("on_request_begin"):
+        request = build_request(credentials, payload)
+        server.extensions.trigger_hook("on_request_begin", {
+            "request": request,
+            "server": server
+        })
+    if server.extensions.has_hook("on_request_end"):
+        server.extensions.trigger_hook("on_request_end", {
+            "request": request or build_request(credentials, payload),
+            "server": server,
+            "response": {"status": 200, "data": 3, "performance": {"size": 10, "time": 0.0}}
+        })
+
+
+def build_request(credentials, payload):
+    return {
+        "trigger": "add",
+        "body": payload,
+        "client": {"ip": credentials.get("ip"), "language": credentials.get("language")}
+    }
+
+
+def make_server(extensions, extension):
+    server = Server()
+    server.extensions = extensions
+    if extension is not None:
+        server.add_extension(extension)
+
+    return server
+
+
+def main(number: int = 200000):
+    credentials = {"language": "python", "ip": "127.0.0.1"}
+    payload = {"a": 1, "b": 2}
+
+    cases = (
+        ("no extensions", None),
+        ("1 no-op extension", NoopExtension),
+        ("1 counting extension", CountingExtension),
+    )
+
+    print(f"{'':<22} {'legacy':>12} {'precompiled':>12}")
+    for label, factory in cases:
+        legacy = make_server(LegacyExtensions(),
+                             factory() if factory else None)
+        current = make_server(Extensions(), factory() if factory else None)
+
+        legacy_seconds = min(timeit.repeat(
+            lambda: legacy_request(legacy, credentials, payload), number=number, repeat=5))
+        current_seconds = min(timeit.repeat(
+            lambda: current_request(current, credentials, payload), number=number, repeat=5))
+
+        print(f"{label:<22} {legacy_seconds / number * 1e6:9.3f} µs "
+              f"{current_seconds / number * 1e6:9.3f} µs")
+
+
+if __name__ == "__main__":
+    main()
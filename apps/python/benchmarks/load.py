@@ -0,0 +1,333 @@
+"""Throughput, latency and server CPU/RSS under a local concurrent load.
+
+Each run starts a fresh server process with one configuration (engine, TLS, extensions)
+and drives one trigger over keep-alive connections from client threads.
+
+Run from apps/python:  python benchmarks/load.py --quick
+Save results:          python benchmarks/load.py --json results.json
+Catch regressions:     python benchmarks/load.py --baseline results.json
+"""
+import os
+import ssl
+import sys
+import json
+import time
+import signal
+import socket
+import asyncio
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+import pydantic
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from cromio import Server, BaseExtension  # noqa: E402
+from cromio.extensions import Extensions  # noqa: E402
+
+
+TRIGGERS = ("trivial", "validated", "large", "slow_io")
+CREDENTIALS = {"language": "python", "ip": "127.0.0.1"}
+
+
+class ItemSchema(pydantic.BaseModel):
+    name: str
+    price: float
+    tags: list[str]
+
+
+class CountingExtension(BaseExtension):
+    def __init__(self):
+        self.requests = 0
+        self.responses = 0
+        self.errors = 0
+
+    def on_request_begin(self, context):
+        self.requests += 1
+
+    def on_request_end(self, context):
+        self.responses += 1
+
+    def on_error(self, context):
+        self.errors += 1
+
+
+def build_server(config: dict) -> Server:
+    server = Server(port=config["port"], engine=config["engine"], tls=config["tls"],
+                    concurrency=max(64, config["concurrency"]))
+
+    @server.on_trigger("trivial")
+    def trivial(ctx):
+        return 1
+
+    @server.on_trigger("validated", schema=ItemSchema)
+    def validated(ctx):
+        return ctx["body"]["price"] * 2
+
+    @server.on_trigger("large")
+    def large(ctx):
+        # Echoed back, so the payload is decoded, encoded and compressed once each way
+        return ctx["body"]["blob"]
+
+    @server.on_trigger("slow_io")
+    async def slow_io(ctx):
+        await asyncio.sleep(0.01)
+        return "done"
+
+    if config["extensions"]:
+        server.add_extension(CountingExtension(), Extensions.prometheusMetrics(
+            show_logs=False, port=config["port"] + 1))
+
+    if config.get("profiler"):
+        # Default sampling rate; its endpoints ride on the metrics server when extensions are on
+        server.add_extension(Extensions.samplingProfiler(show_logs=False))
+
+    return server
+
+
+def request_body(trigger: str, payload_bytes: int) -> bytes:
+    body = {}
+    if trigger == "validated":
+        body = {"name": "item", "price": 9.5, "tags": ["a", "b", "c"]}
+    elif trigger == "large":
+        body = {"blob": "x" * payload_bytes}
+
+    return json.dumps({"trigger": trigger, "body": body, "credentials": CREDENTIALS}).encode("utf-8")
+
+
+def wait_for_port(port: int, timeout: float = 10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+
+    raise RuntimeError(f"Server did not start listening on port {port}")
+
+
+def start_server(config: dict) -> subprocess.Popen:
+    # A separate interpreter, so server CPU and RSS are measured apart from the load generator
+    process = subprocess.Popen([sys.executable, __file__, "--serve", json.dumps(config)],
+                               stdout=subprocess.DEVNULL)
+    wait_for_port(config["port"])
+    return process
+
+
+def stop_server(process: subprocess.Popen) -> dict:
+    process.send_signal(signal.SIGTERM)
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = status
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    rss = usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    return {"cpu_s": usage.ru_utime + usage.ru_stime, "max_rss_mib": rss / 2 ** 20}
+
+
+def connect(config: dict) -> http.client.HTTPConnection:
+    if config["tls"]:
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        return http.client.HTTPSConnection("127.0.0.1", config["port"], context=context, timeout=30)
+
+    return http.client.HTTPConnection("127.0.0.1", config["port"], timeout=30)
+
+
+def drive(config: dict, body: bytes, duration: float, warmup: float) -> dict:
+    headers = {"Content-Type": "application/json", "Accept-Encoding": "gzip"}
+    start = time.perf_counter()
+    measure_from = start + warmup
+    stop_at = measure_from + duration
+    latencies: list = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def client():
+        conn = connect(config)
+        local = []
+        failed = 0
+        while True:
+            sent = time.perf_counter()
+            if sent >= stop_at:
+                break
+            try:
+                conn.request("POST", "/", body, headers)
+                response = conn.getresponse()
+                response.read()
+                ok = response.status == 200
+                if response.getheader("Connection", "").lower() == "close":
+                    conn.close()
+                    conn = connect(config)
+            except (OSError, http.client.HTTPException):
+                ok = False
+                conn.close()
+                conn = connect(config)
+
+            done = time.perf_counter()
+            if sent >= measure_from:
+                if ok:
+                    local.append(done - sent)
+                else:
+                    failed += 1
+
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client) for _ in range(config["concurrency"])]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+
+    def percentile(p: float) -> float:
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": len(latencies) / duration,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "max_ms": latencies[-1] * 1000 if latencies else 0.0,
+    }
+
+
+def self_signed_cert(directory: str):
+    # TLS runs need a certificate; generate a throwaway one when openssl is available
+    cert, key = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    try:
+        subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                        "-subj", "/CN=localhost", "-keyout", key, "-out", cert],
+                       check=True, capture_output=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+    return {"cert": cert, "key": key}
+
+
+def run_key(result: dict) -> tuple:
+    return (result["engine"], result["tls"], result["extensions"], result.get("profiler", False),
+            result["trigger"], result["payload_bytes"])
+
+
+def compare(results: list, baseline_path: str, tolerance: float) -> list:
+    with open(baseline_path) as f:
+        baseline = {run_key(r): r for r in json.load(f)["results"]}
+
+    regressions = []
+    for result in results:
+        base = baseline.get(run_key(result))
+        if base is None:
+            continue
+        if result["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{run_key(result)}: rps {base['rps']:.0f} -> {result['rps']:.0f}")
+        if result["p99_ms"] > base["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{run_key(result)}: p99 {base['p99_ms']:.2f}ms -> {result['p99_ms']:.2f}ms")
+
+    return regressions
+
+
+def flags(value: str) -> list:
+    return [part.strip() == "on" for part in value.split(",") if part.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--engines", default="threaded,asyncio")
+    parser.add_argument("--triggers", default=",".join(TRIGGERS))
+    parser.add_argument("--payload-sizes", default="1024,65536,1048576",
+                        help="bytes echoed by the 'large' trigger")
+    parser.add_argument("--tls", default="off,on")
+    parser.add_argument("--extensions", default="off,on")
+    parser.add_argument("--profiler", default="off", help="sampling profiler: off, on or off,on")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--warmup", type=float, default=1)
+    parser.add_argument("--quick", action="store_true",
+                        help="threaded engine, TLS off, 1s runs")
+    parser.add_argument("--port", type=int, default=2400)
+    parser.add_argument("--cert")
+    parser.add_argument("--key")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="fail when results regress against this file")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    parser.add_argument("--serve", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        return build_server(json.loads(args.serve)).start()(lambda url: None)
+
+    if args.quick:
+        args.engines, args.tls, args.duration, args.warmup = "threaded", "off", 1, 0.3
+
+    tls = {"cert": args.cert, "key": args.key} if args.cert and args.key else None
+    if True in flags(args.tls) and tls is None:
+        tls = self_signed_cert(tempfile.mkdtemp(prefix="cromio-bench-"))
+        if tls is None:
+            print("⚠️ openssl not found and no --cert/--key given, skipping TLS runs")
+
+    runs = []
+    for engine in args.engines.split(","):
+        for use_tls in flags(args.tls):
+            if use_tls and tls is None:
+                continue
+            for extensions in flags(args.extensions):
+                for profiler in flags(args.profiler):
+                    for trigger in args.triggers.split(","):
+                        sizes = [int(s) for s in args.payload_sizes.split(",")] if trigger == "large" else [0]
+                        for size in sizes:
+                            runs.append((engine, use_tls, extensions, profiler, trigger, size))
+
+    print(f"{'engine':<9}{'tls':<5}{'ext':<5}{'prof':<5}{'trigger':<11}{'payload':>9}{'rps':>10}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'cpu µs/req':>12}{'rss MiB':>9}{'errors':>8}")
+
+    results = []
+    for index, (engine, use_tls, extensions, profiler, trigger, size) in enumerate(runs):
+        # A new port per run avoids waiting on sockets left in TIME_WAIT
+        config = {"engine": engine, "tls": tls if use_tls else None, "extensions": extensions,
+                  "profiler": profiler, "port": args.port + 2 * index, "concurrency": args.concurrency}
+
+        process = start_server(config)
+        try:
+            load = drive(config, request_body(trigger, size), args.duration, args.warmup)
+        finally:
+            usage = stop_server(process)
+
+        result = {
+            "engine": engine, "tls": use_tls, "extensions": extensions, "profiler": profiler, "trigger": trigger,
+            "payload_bytes": size, "concurrency": args.concurrency, "duration_s": args.duration,
+            **load, **usage,
+            # Includes warmup and startup, so it is an upper bound per request
+            "cpu_per_request_us": usage["cpu_s"] / max(load["requests"], 1) * 1e6,
+        }
+        results.append(result)
+        print(f"{engine:<9}{'on' if use_tls else 'off':<5}{'on' if extensions else 'off':<5}"
+              f"{'on' if profiler else 'off':<5}{trigger:<11}"
+              f"{size:>9}{result['rps']:>10.0f}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+              f"{result['p99_ms']:>9.2f}{result['cpu_per_request_us']:>12.0f}{result['max_rss_mib']:>9.1f}"
+              f"{result['errors']:>8}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"python": sys.version.split()[0], "results": results}, f, indent=2)
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        for line in regressions:
+            print(f"❌ Regression {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
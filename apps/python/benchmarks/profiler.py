@@ -0,0 +1,71 @@
+"""Sampling profiler overhead: cost of one sample, and end-to-end throughput with it on.
+
+Run from apps/python:  python benchmarks/profiler.py
+
+On a single-core Linux VM with CPython 3.12: one sample costs 0.4-0.5 ms (under 5% of a core at
+the default 100 Hz, with every thread busy), and throughput with the profiler on stays
+within the run-to-run noise of the load benchmark (about ±15% there).
+"""
+import os
+import sys
+import time
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from cromio.extensions.builtin.profiler.stacks import StackCounter  # noqa: E402
+import load  # noqa: E402
+
+
+def deep(depth: int, ready: threading.Event, stop: threading.Event):
+    if depth:
+        return deep(depth - 1, ready, stop)
+    ready.set()
+    stop.wait()
+
+
+def sample_cost(threads: int = 16, depth: int = 40, number: int = 2000) -> float:
+    # Parked threads with request-sized stacks; Event.wait is not an idle frame, so all are sampled
+    stop = threading.Event()
+    names = {}
+    for index in range(threads):
+        ready = threading.Event()
+        thread = threading.Thread(target=deep, args=(depth, ready, stop),
+                                  name=f"cromio-worker_{index}", daemon=True)
+        thread.start()
+        ready.wait()
+        names[thread.ident] = StackCounter.thread_group(thread.name)
+
+    counter = StackCounter()
+    start = time.perf_counter()
+    for _ in range(number):
+        counter.sample(names)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    return elapsed / number
+
+
+def main(duration: float = 5, interval: float = 0.01):
+    cost = sample_cost()
+    print(f"one sample of 16 threads x 40 frames: {cost * 1e6:.0f} µs "
+          f"({cost / interval * 100:.2f}% of one core at {1 / interval:.0f} Hz)")
+
+    for run, trigger in enumerate(("trivial", "validated")):
+        results = {}
+        for index, profiler in enumerate((False, True)):
+            config = {"engine": "threaded", "tls": None, "extensions": False, "profiler": profiler,
+                      "port": 2600 + 10 * run + 2 * index, "concurrency": 16}
+            process = load.start_server(config)
+            try:
+                results[profiler] = load.drive(config, load.request_body(trigger, 0), duration, 1)
+            finally:
+                load.stop_server(process)
+
+        off, on = results[False], results[True]
+        print(f"{trigger:<10} rps {off['rps']:8.0f} -> {on['rps']:8.0f} ({(on['rps'] / off['rps'] - 1) * 100:+.1f}%)   "
+              f"p99 {off['p99_ms']:6.2f} -> {on['p99_ms']:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Rate-limit check cost with 1M distinct keys, token bucket vs GCRA.
+
+Run from apps/python:  python benchmarks/rate_limit.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from cromio.extensions.builtin.rateLimiter import RequestRateLimiter  # noqa: E402
+
+
+def main(keys: int = 1_000_000):
+    names = [f"ip:10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(keys)]
+
+    for algorithm in ("token_bucket", "gcra"):
+        # Twice as many slots as keys keeps probe windows short
+        limiter = RequestRateLimiter(
+            limit=100, interval=60000, slots=2 * keys, algorithm=algorithm)
+        table_mib = len(limiter.buckets.memory) / 2 ** 20
+
+        start = time.perf_counter()
+        for name in names:
+            limiter._take(name, limiter.limit)
+        first = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for name in names:
+            limiter._take(name, limiter.limit)
+        repeat = time.perf_counter() - start
+
+        print(f"{algorithm:<13} new keys {first / keys * 1e6:6.2f} µs/check   "
+              f"existing keys {repeat / keys * 1e6:6.2f} µs/check   table {table_mib:5.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 from .server import Server
-from .typing import OnRequestErrorType, OnRequestBeginType, OnRequestEndType, OnTriggerType
+from .typing import OnRequestErrorType, OnRequestAdmitType, OnRequestBeginType, OnRequestEndType, OnTriggerType, OnWorkerStartType, OnWorkerExitType
 from .utils.TriggerDefinition import TriggerDefinition
-from .extensions.utils import BaseExtension
+from .extensions.utils import BaseExtension, RequestRejectedError
 from .extensions import Extensions
+from .utils.Codecs import Codec, CodecRegistry, JsonCodec, OrjsonCodec, MsgpackCodec
+from .utils.Compression import CompressionPolicy
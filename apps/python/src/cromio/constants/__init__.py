@@ -11,7 +11,56 @@ SERVER_INFO.PLATFORM
 ALLOWED_EXTENSION_METHODS = {
     "inject_properties",
     "on_start",
+    "on_request_admit",
     "on_request_begin",
+    "on_request_end",
+    "on_error",
+    "on_worker_start",
+    "on_worker_exit"
+}
+
+
+# Hooks that may be deferred to the background dispatcher; the rest must
+# run inline because they can still affect the response.
+BACKGROUND_EXTENSION_METHODS = {
     "on_request_end",
     "on_error"
 }
+
+
+# Trigger priority classes, most urgent first; queued requests are admitted in this order
+PRIORITY_CLASSES = ("high", "normal", "low")
+DEFAULT_PRIORITY = "normal"
+
+
+# Fixed set of values for the "category" of an on_error context
+ERROR_CATEGORIES = {
+    "validation",
+    "decompression",
+    "unknown_trigger",
+    "handler",
+    "auth",
+    "bad_batch",
+    "rate_limited",
+    "busy",
+    "deadline",
+    "disconnected"
+}
+
+
+# Request body made of a small JSON header and the raw, undecoded payload bytes
+ENVELOPE_CONTENT_TYPE = "application/vnd.cromio.envelope"
+
+
+SERVER_ENGINES = {
+    "simple",
+    "threaded",
+    "asyncio"
+}
+
+
+# Request "type" values that ask for a chunked, incrementally compressed reply
+STREAM_MESSAGE_TYPES = {
+    "stream",
+    "subscribe"
+}
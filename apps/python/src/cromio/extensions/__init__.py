@@ -1,13 +1,19 @@
+from typing import Dict, Optional
 from cromio.extensions.builtin.prometheus import PrometheusExtension
 from cromio.extensions.builtin.prometheus.utils import ExtraCallbacksType
+from cromio.extensions.builtin.profiler import SamplingProfiler
 from cromio.extensions.builtin.rateLimiter import RequestRateLimiter
 
 
 class Extensions:
     @staticmethod
-    def prometheusMetrics(name: str = "viper_rpc_server", show_logs: bool = True, port: int = 2048, callbacks: ExtraCallbacksType = {}) -> PrometheusExtension:
-        return PrometheusExtension(name, show_logs, port, callbacks)
+    def prometheusMetrics(name: str = "viper_rpc_server", show_logs: bool = True, port: int = 2048, callbacks: ExtraCallbacksType = {}, background: bool = False, max_series: int = 1000, pretty: bool = False, compress: bool = True) -> PrometheusExtension:
+        return PrometheusExtension(name, show_logs, port, callbacks, background, max_series, pretty, compress)
 
     @staticmethod
-    def requestRateLimiter(limit: int = 100, interval: int = 60000) -> RequestRateLimiter:
-        return RequestRateLimiter(limit=limit, interval=interval)
+    def requestRateLimiter(limit: int = 100, interval: int = 60000, key: str = "ip", trigger_limits: Optional[Dict[str, int]] = None, algorithm: str = "token_bucket", slots: int = 65536) -> RequestRateLimiter:
+        return RequestRateLimiter(limit=limit, interval=interval, key=key, trigger_limits=trigger_limits, slots=slots, algorithm=algorithm)
+
+    @staticmethod
+    def samplingProfiler(interval: float = 0.01, slow_requests: int = 20, window: float = 300, port: Optional[int] = None, show_logs: bool = True, background: bool = False) -> SamplingProfiler:
+        return SamplingProfiler(interval=interval, slow_requests=slow_requests, window=window, port=port, show_logs=show_logs, background=background)
@@ -0,0 +1,201 @@
+import os
+import glob
+import json
+import time
+import heapq
+import tempfile
+import threading
+from cromio.extensions.utils import BaseExtension
+from cromio.extensions.builtin.profiler.stacks import StackCounter
+from cromio.typing import OnRequestEndType, OnWorkerStartType
+from typing import Any, Dict, List, Optional, Tuple
+import cromio.extensions.builtin.prometheus.utils as MetricsUtils
+
+
+# Threads that serve requests; the hook dispatcher and the profiler itself are left out
+REQUEST_THREAD_PREFIXES = ("cromio-worker", "cromio-handler",
+                           "cromio-batch", "cromio-loop")
+
+
+class SamplingProfiler(BaseExtension):
+    """Samples request-handling thread stacks and keeps the slowest recent requests.
+
+    Collapsed stacks are served at /profile and the slowest requests at
+    /slow-requests, from the Prometheus metrics server (or its own on `port`).
+    """
+
+    def __init__(self, interval: float = 0.01, slow_requests: int = 20, window: float = 300, max_stacks: int = 10000, port: Optional[int] = None, show_logs: bool = True, background: bool = False):
+        super().__init__()
+        if interval <= 0:
+            raise ValueError("'interval' must be greater than 0")
+
+        if slow_requests < 0:
+            raise ValueError("'slow_requests' cannot be negative")
+
+        self.interval = interval  # seconds between samples
+        self.slow_requests = slow_requests
+        self.window = window  # seconds a slow request is kept for
+        self.stacks = StackCounter(max_stacks)
+
+        self._slowest: List[Tuple[float, int, Dict[str, Any]]] = []
+        self._sequence = 0
+        self._pruned_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._serving_thread: Optional[int] = None
+        self._directory: Optional[str] = None
+        self._thread: Optional[threading.Thread] = None
+
+        if background:
+            self.background_hooks = ("on_request_end",)
+
+        MetricsUtils.register_route("/profile", self.profile_route)
+        MetricsUtils.register_route("/slow-requests", self.slow_requests_route)
+        if port is not None:
+            MetricsUtils.start_metrics_server(port, show_logs)
+
+    def on_start(self, context):
+        server = context.get("server")
+        # The simple and asyncio engines serve requests on the thread that starts the server
+        if getattr(server, "engine", "simple") != "threaded":
+            self._serving_thread = threading.get_ident()
+
+        if getattr(server, "workers", 1) > 1:
+            # Workers write their samples here; the supervisor's endpoints merge them
+            self._directory = tempfile.mkdtemp(prefix="cromio-profile-")
+            return
+
+        self._start_sampler()
+
+    def on_worker_start(self, context: OnWorkerStartType):
+        # Forked workers inherit the supervisor's state but none of its threads
+        self.stacks = StackCounter(self.stacks.max_stacks)
+        self._slowest = []
+        self._start_sampler()
+
+    def _start_sampler(self):
+        self._thread = threading.Thread(
+            target=self._run, name="cromio-profiler", daemon=True)
+        self._thread.start()
+
+    def _request_threads(self) -> Dict[int, str]:
+        threads = {}
+        for thread in threading.enumerate():
+            if thread.name.startswith(REQUEST_THREAD_PREFIXES):
+                threads[thread.ident] = StackCounter.thread_group(thread.name)
+            elif thread.ident == self._serving_thread:
+                threads[thread.ident] = "server"
+
+        return threads
+
+    def _run(self):
+        threads = self._request_threads()
+        refresh_at = flush_at = next_at = time.monotonic()
+        me = threading.get_ident()
+
+        while True:
+            now = time.monotonic()
+            if now >= refresh_at:
+                # Thread lists change rarely; listing them on every sample would dominate
+                threads = self._request_threads()
+                refresh_at = now + 1
+
+            with self._lock:
+                self.stacks.sample(threads, skip=me)
+
+            if self._directory and now >= flush_at:
+                self._dump()
+                flush_at = now + 1
+
+            next_at += self.interval
+            delay = next_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # Fell behind (a long GIL hold); skip the missed samples instead of bursting
+                next_at = time.monotonic()
+
+    def _dump(self):
+        with self._lock:
+            data = {"stacks": self.stacks.collapsed(), "slowest": self._recent()}
+
+        path = os.path.join(self._directory, f"profile-{os.getpid()}.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(data, f)
+        os.replace(path + ".tmp", path)
+
+    def _recent(self) -> List[Dict[str, Any]]:
+        cutoff = time.time() - self.window
+        return [entry for _, _, entry in self._slowest if entry["at"] >= cutoff]
+
+    def _snapshot(self) -> Tuple[Dict[str, int], List[Dict[str, Any]]]:
+        with self._lock:
+            stacks, slowest = self.stacks.collapsed(), self._recent()
+
+        if self._directory:
+            for path in glob.glob(os.path.join(self._directory, "profile-*.json")):
+                try:
+                    with open(path) as f:
+                        data = json.load(f)
+                except (OSError, ValueError):
+                    continue
+
+                for line, count in data["stacks"].items():
+                    stacks[line] = stacks.get(line, 0) + count
+                slowest.extend(data["slowest"])
+
+        slowest.sort(key=lambda entry: entry["time"], reverse=True)
+        return stacks, slowest[:self.slow_requests]
+
+    def profile_route(self) -> Tuple[bytes, str]:
+        stacks, _ = self._snapshot()
+        return StackCounter.render(stacks.items()), "text/plain; charset=utf-8"
+
+    def slow_requests_route(self) -> Tuple[bytes, str]:
+        _, slowest = self._snapshot()
+        body = {"interval": self.interval, "window": self.window, "requests": slowest}
+        return json.dumps(body).encode("utf-8"), "application/json"
+
+    def on_request_end(self, context: OnRequestEndType):
+        if not self.slow_requests:
+            return
+
+        performance = context.get("response", {}).get("performance", {})
+        elapsed = performance.get("time", 0)
+        # Most requests are faster than the current N slowest and stop here, without the lock.
+        # _prune swaps in a new list but never shrinks one in place, so a full local one is safe.
+        slowest = self._slowest
+        if len(slowest) >= self.slow_requests and elapsed <= slowest[0][0]:
+            now = time.monotonic()
+            if now - self._pruned_at < self.window / 10:
+                return
+            self._prune(now)
+
+        request = context.get("request", {})
+        entry = {
+            "trigger": request.get("trigger"),
+            "time": elapsed,
+            "status": context.get("response", {}).get("status"),
+            "request_size": performance.get("request_size"),
+            "response_size": performance.get("size"),
+            "encoding": performance.get("encoding"),
+            "cache": performance.get("cache"),
+            "stages": performance.get("stages"),
+            "at": time.time(),
+            "pid": os.getpid(),
+        }
+
+        with self._lock:
+            self._sequence += 1
+            item = (elapsed, self._sequence, entry)
+            if len(self._slowest) < self.slow_requests:
+                heapq.heappush(self._slowest, item)
+            elif elapsed > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, item)
+
+    def _prune(self, now: float):
+        # Old spikes would otherwise hold their places forever
+        cutoff = time.time() - self.window
+        with self._lock:
+            self._slowest = [item for item in self._slowest if item[2]["at"] >= cutoff]
+            heapq.heapify(self._slowest)
+            self._pruned_at = now
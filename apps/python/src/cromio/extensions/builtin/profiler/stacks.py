@@ -0,0 +1,100 @@
+import os
+import sys
+from types import CodeType, FrameType
+from typing import Dict, Iterable, Optional, Tuple
+
+
+# Innermost frames of threads waiting for work rather than serving a request
+IDLE_FRAMES = {
+    ("thread.py", "_worker"),
+    ("selectors.py", "select"),
+    ("socket.py", "accept"),
+    ("ServerUtils.py", "_read_http_request"),
+}
+
+TRUNCATED = "[truncated]"
+
+
+class StackCounter:
+    """Sample counts per (thread group, stack), rendered as flamegraph collapsed stacks."""
+
+    def __init__(self, max_stacks: int = 10000):
+        self.max_stacks = max_stacks
+        self.counts: Dict[Tuple[str, tuple], int] = {}
+        self.samples = 0
+        # Stacks are keyed by code object ids, which hash far faster than the code
+        # objects; holding each code here keeps its id from being reused
+        self._codes: Dict[int, CodeType] = {}
+        self._labels: Dict[int, str] = {}
+        self._idle: Dict[int, bool] = {}
+
+    @staticmethod
+    def thread_group(name: str) -> str:
+        # Pool threads are numbered ("cromio-worker_3"); their samples merge into one root
+        return name.rsplit("_", 1)[0] if name.rsplit("_", 1)[-1].isdigit() else name
+
+    def add(self, group: str, frame: FrameType) -> bool:
+        """Counts one sample of a thread; returns False when it was idle."""
+        code = frame.f_code
+        idle = self._idle.get(id(code))
+        if idle is None:
+            self._codes[id(code)] = code
+            idle = self._idle[id(code)] = (
+                os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES
+        if idle:
+            return False
+
+        stack = []
+        current = frame
+        while current is not None:
+            stack.append(id(current.f_code))
+            current = current.f_back
+
+        key = (group, tuple(stack))
+        count = self.counts.get(key)
+        if count is None:
+            if len(self.counts) >= self.max_stacks:
+                key = (group, TRUNCATED)
+                count = self.counts.get(key, 0)
+            else:
+                count = 0
+                # Only a stack not seen before pays for holding on to its code objects
+                while frame is not None:
+                    self._codes.setdefault(id(frame.f_code), frame.f_code)
+                    frame = frame.f_back
+
+        self.counts[key] = count + 1
+        self.samples += 1
+        return True
+
+    def sample(self, threads: Dict[int, str], skip: Optional[int] = None) -> int:
+        taken = 0
+        for ident, frame in sys._current_frames().items():
+            name = threads.get(ident)
+            if name is not None and ident != skip and self.add(name, frame):
+                taken += 1
+
+        return taken
+
+    def _label(self, code_id: int) -> str:
+        label = self._labels.get(code_id)
+        if label is None:
+            code = self._codes[code_id]
+            label = self._labels[code_id] = (
+                f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        return label
+
+    def collapsed(self) -> Dict[str, int]:
+        lines: Dict[str, int] = {}
+        for (group, stack), count in list(self.counts.items()):
+            # Frames were collected innermost first; collapsed stacks go root first
+            frames = TRUNCATED if stack == TRUNCATED else ";".join(
+                self._label(code_id) for code_id in reversed(stack))
+            line = f"{group};{frames}"
+            lines[line] = lines.get(line, 0) + count
+
+        return lines
+
+    @staticmethod
+    def render(lines: Iterable[Tuple[str, int]]) -> bytes:
+        return "".join(f"{line} {count}\n" for line, count in sorted(lines)).encode("utf-8")
@@ -1,17 +1,57 @@
 from cromio.extensions.utils import BaseExtension
-from cromio.typing import OnRequestBeginType, OnRequestEndType, OnRequestErrorType
+from cromio.typing import OnRequestBeginType, OnRequestEndType, OnRequestErrorType, OnWorkerExitType
+from prometheus_client import REGISTRY
+from typing import Any, Dict, Set, Tuple
 import cromio.extensions.builtin.prometheus.utils as Utils
 
 
+class RequestSeries:
+    """Pre-bound metric children for one (trigger, client) label pair."""
+
+    def __init__(self, extension: "PrometheusExtension", trigger: str, client: str):
+        self.extension = extension
+        self.trigger = trigger
+        self.client = client
+        self.pending = extension.pending_requests.labels(
+            trigger=trigger, client=client)
+        self.size = extension.response_size_bytes.labels(
+            trigger=trigger, client=client)
+        self.by_status: Dict[int, tuple] = {}
+
+    def status(self, status: int) -> tuple:
+        children = self.by_status.get(status)
+        if children is None:
+            children = self.by_status[status] = (
+                self.extension.request_duration_seconds.labels(
+                    trigger=self.trigger, client=self.client, status=status),
+                self.extension.total_responses.labels(
+                    trigger=self.trigger, client=self.client, status=status),
+            )
+
+        return children
+
+
 class PrometheusExtension(BaseExtension):
-    def __init__(self, name="viper_rpc_server", show_logs=True, port=2048, callbacks: Utils.ExtraCallbacksType = {}):
+    def __init__(self, name="viper_rpc_server", show_logs=True, port=2048, callbacks: Utils.ExtraCallbacksType = {}, background: bool = False, max_series: int = 1000, pretty: bool = False, compress: bool = True):
         super().__init__()
 
+        self.name = name
         self.show_logs = show_logs
         self.callbacks = callbacks
+        # Distinct label combinations per metric before new ones go to the overflow series
+        self.max_series = max_series
+        self.known_ips: Set[str] = set()
+
+        # Record responses and errors (and run their callbacks) off the request path
+        if background:
+            self.background_hooks = ("on_request_end", "on_error")
 
-        # Start custom HTTP server for pretty metrics
-        Utils.start_metrics_server(port, show_logs)
+        # Start the /metrics HTTP server; pretty output is opt-in, gzip is used when the scraper accepts it
+        Utils.start_metrics_server(port, show_logs, pretty, compress)
+        self._init_metrics()
+
+    def _init_metrics(self):
+        name = self.name
 
         # Initialize Prometheus metrics
         self.dropped_requests_total = Utils.dropped_requests_total(name)
@@ -19,61 +59,157 @@ class PrometheusExtension(BaseExtension):
         self.pending_requests = Utils.pending_requests(name)
         self.request_duration_seconds = Utils.request_duration_seconds(name)
         self.response_size_bytes = Utils.response_size_bytes(name)
+        self.request_stage_seconds = Utils.request_stage_seconds(name)
+        self.reused_connections_total = Utils.reused_connections_total(name)
+        self.cache_lookups_total = Utils.cache_lookups_total(name)
+        self.cache_evictions = Utils.cache_evictions(name)
+        self.coalesced_requests_total = Utils.coalesced_requests_total(name)
+        self.admitted_requests = Utils.admitted_requests(name)
+        self.queued_requests = Utils.queued_requests(name)
+        self.queue_wait_seconds = Utils.queue_wait_seconds(name)
+
+        # .labels() children are resolved once per label combination, not per request
+        self._series: Dict[Tuple[str, str], RequestSeries] = {}
+        self._dropped: Dict[Tuple[str, str, str], Any] = {}
+        self._stages: Dict[Tuple[str, str], Any] = {}
+
+    def _request_series(self, context) -> RequestSeries:
+        request = context.get("request", {})
+        server = context.get("server")
+        key = (Utils.trigger_label(request.get("trigger"), server),
+               Utils.client_label(request.get("client"), self.known_ips))
 
-    def on_request_begin(self, context: OnRequestBeginType):
+        series = self._series.get(key)
+        if series is None:
+            if len(self._series) >= self.max_series:
+                key = (Utils.OVERFLOW_LABEL, Utils.OVERFLOW_LABEL)
+                series = self._series.get(key)
+
+            if series is None:
+                series = self._series[key] = RequestSeries(self, *key)
+
+        return series
+
+    def _dropped_series(self, context):
         request = context.get("request", {})
-        trigger = request.get("trigger", "")
-        client = request.get("client", {})
-        self.pending_requests.labels(trigger=trigger, client=client).inc()
+        key = (Utils.trigger_label(request.get("trigger"), context.get("server")),
+               Utils.client_label(request.get("client"), self.known_ips),
+               Utils.error_category(context.get("category")))
+
+        child = self._dropped.get(key)
+        if child is None:
+            if len(self._dropped) >= self.max_series:
+                key = (Utils.OVERFLOW_LABEL, Utils.OVERFLOW_LABEL, key[2])
+                child = self._dropped.get(key)
+
+            if child is None:
+                child = self._dropped[key] = self.dropped_requests_total.labels(
+                    trigger=key[0], client=key[1], reason=key[2])
+
+        return child
+
+    def on_start(self, context):
+        server = context.get("server")
+        # Only clients configured on the server get their ip as a label value
+        self.known_ips = {
+            client.get("ip") for client in getattr(server, "clients", {}).values()
+            if client.get("ip") not in (None, "*")
+        }
+
+        admission = getattr(server, "admission", None)
+        if getattr(server, "workers", 1) <= 1:
+            if admission is not None:
+                # Read at scrape time; forked workers push theirs whenever they change instead
+                self.admitted_requests.set_function(lambda: admission.in_flight)
+                self.queued_requests.set_function(lambda: admission.queue_depth)
+            return
+
+        # Recreate the metrics as multiprocess values before the workers fork,
+        # so the endpoint served from the supervisor aggregates all of them.
+        for metric in (self.dropped_requests_total, self.total_responses, self.pending_requests,
+                       self.request_duration_seconds, self.response_size_bytes, self.request_stage_seconds, self.reused_connections_total,
+                       self.cache_lookups_total, self.cache_evictions, self.coalesced_requests_total,
+                       self.admitted_requests, self.queued_requests, self.queue_wait_seconds):
+            REGISTRY.unregister(metric)
+
+        Utils.enable_multiprocess()
+        self._init_metrics()
+
+        if admission is not None and admission.max_in_flight is not None:
+            # Called after a slot is released, which request hooks never see
+            admission.listeners.append(self._record_admission)
+
+    def _record_admission(self, admission):
+        # Shed requests are counted by on_error under the "busy" and "deadline" reasons
+        self.admitted_requests.set(admission.in_flight)
+        self.queued_requests.set(admission.queue_depth)
+
+    def on_worker_exit(self, context: OnWorkerExitType):
+        Utils.mark_process_dead(context.get("pid"))
+
+    def on_request_begin(self, context: OnRequestBeginType):
+        self._request_series(context).pending.inc()
 
         on_request_begin_callback = self.callbacks.get("on_request_begin")
         if on_request_begin_callback:
             on_request_begin_callback(context)
 
     def on_request_end(self, context: OnRequestEndType):
-        request = context.get("request", {})
         response = context.get("response", {})
-
-        client = request.get("client", {})
-        trigger = request.get("trigger", "")
-        status = response.get("status", 200)
         performance = response.get("performance", {})
-        duration = performance.get("time", 0)
-        size = performance.get("size", 0)
-
-        self.request_duration_seconds.labels(
-            trigger=trigger, client=client, status=status
-        ).observe(duration)
-
-        self.total_responses.labels(
-            trigger=trigger, client=client, status=status
-        ).inc()
-
-        self.response_size_bytes.labels(
-            trigger=trigger, client=client
-        ).observe(size)
-
-        self.pending_requests.labels(
-            trigger=trigger, client=client
-        ).dec()
+        trigger = context.get("request", {}).get("trigger", "")
+
+        series = self._request_series(context)
+        duration, total = series.status(response.get("status", 200))
+        duration.observe(performance.get("time", 0))
+        total.inc()
+        series.size.observe(performance.get("size", 0))
+        series.pending.dec()
+
+        # Present only when the server runs with stage_timings enabled
+        stages = performance.get("stages")
+        if stages:
+            for stage, seconds in stages.items():
+                key = (series.trigger, stage)
+                child = self._stages.get(key)
+                if child is None:
+                    child = self._stages[key] = self.request_stage_seconds.labels(
+                        trigger=series.trigger, stage=stage)
+                child.observe(seconds)
+
+        # Present only for requests that went through admission control
+        queue_wait = performance.get("queue_wait")
+        if queue_wait is not None:
+            self.queue_wait_seconds.labels(
+                priority=performance.get("priority", "normal")).observe(queue_wait)
+
+        if performance.get("reused", False):
+            self.reused_connections_total.inc()
+
+        if performance.get("coalesced", False):
+            self.coalesced_requests_total.labels(trigger=trigger).inc()
+
+        cache_status = performance.get("cache")
+        if cache_status:
+            self.cache_lookups_total.labels(
+                trigger=trigger, result=cache_status).inc()
+
+            cache = context.get("server").result_caches.get(trigger)
+            if cache is not None:
+                self.cache_evictions.labels(trigger=trigger).set(
+                    cache.stats["evictions"])
 
         on_request_end_callback = self.callbacks.get("on_request_end")
         if on_request_end_callback:
             on_request_end_callback(context)
 
     def on_error(self, context: OnRequestErrorType):
-        request = context.get("request", {})
-        error = context.get("error")
-
-        trigger = request.get("trigger")
-        client = request.get("client", {})
-        reason = str(error)
+        # The reason label is a fixed error category, never the raw message
+        self._dropped_series(context).inc()
 
-        self.dropped_requests_total.labels(
-            trigger=trigger,
-            client=client,
-            reason=reason
-        ).inc()
+        # Handler failures and abandoned streams are the only errors raised after on_request_begin
+        if context.get("category") in ("handler", "disconnected"):
+            self._request_series(context).pending.dec()
 
         on_error_callback = self.callbacks.get("on_error")
         if on_error_callback:
@@ -1,10 +1,24 @@
-from typing import Callable, TypedDict
+import os
+import glob
+import gzip
+import tempfile
+from typing import Any, Callable, Dict, Optional, Set, Tuple, TypedDict
 from cromio.extensions.utils import BaseExtension
-from prometheus_client import Histogram, Gauge, generate_latest, CONTENT_TYPE_LATEST
-from http.server import BaseHTTPRequestHandler, HTTPServer
+from prometheus_client import Counter, Histogram, Gauge, CollectorRegistry, REGISTRY, generate_latest, multiprocess, values, CONTENT_TYPE_LATEST
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from threading import Thread
+from cromio.constants import ERROR_CATEGORIES
 from cromio.typing import OnRequestBeginType, OnRequestEndType, OnRequestErrorType
 
+
+# Label value that absorbs new series once max_series is reached
+OVERFLOW_LABEL = "__overflow__"
+KNOWN_LANGUAGES = {"python", "nodejs"}
+
+# Extra GET endpoints served next to /metrics: path -> () -> (body, content type)
+ROUTES: Dict[str, Callable[[], Tuple[bytes, str]]] = {}
+
+
 class ExtraCallbacksType(TypedDict):
     on_request_begin: Callable[[OnRequestBeginType], None]
     on_request_end: Callable[[OnRequestEndType], None]
@@ -12,7 +26,7 @@ class ExtraCallbacksType(TypedDict):
 
 
 def dropped_requests_total(name: str = "viper_rpc_server"):
-    return Gauge(
+    return Counter(
         name=f"{name}_dropped_requests_total",
         documentation="Total number of dropped (cancelled/timed-out) requests",
         labelnames=["trigger", "client", "reason"]
@@ -20,7 +34,8 @@ def dropped_requests_total(name: str = "viper_rpc_server"):
 
 
 def total_responses(name: str = "viper_rpc_server"):
-    return Gauge(
+    # Exposed as {name}_total_responses_total
+    return Counter(
         name=f"{name}_total_responses",
         documentation="Total number of responses by trigger, status, and data",
         labelnames=["trigger", "client", "status"]
@@ -31,7 +46,8 @@ def pending_requests(name: str = "viper_rpc_server"):
     return Gauge(
         name=f"{name}_pending_requests",
         documentation="Current number of pending requests",
-        labelnames=["trigger", "client"]
+        labelnames=["trigger", "client"],
+        multiprocess_mode="livesum"
     )
 
 
@@ -54,32 +70,171 @@ def response_size_bytes(name: str = "viper_rpc_server"):
     )
 
 
-def start_metrics_server(port=2048, show_logs=True):
+def request_stage_seconds(name: str = "viper_rpc_server"):
+    return Histogram(
+        name=f"{name}_request_stage_seconds",
+        documentation="Time spent in each request stage (read, parse, decompress, decode, auth, validation, middlewares, handler, serialize, compress)",
+        labelnames=["trigger", "stage"],
+        buckets=[0.00001, 0.00005, 0.0001, 0.00025, 0.0005, 0.001,
+                 0.0025, 0.005, 0.01, 0.05, 0.1, 0.5, 1]
+    )
+
+
+def reused_connections_total(name: str = "viper_rpc_server"):
+    return Counter(
+        name=f"{name}_reused_connections",
+        documentation="Total number of requests served over an already open keep-alive connection"
+    )
+
+
+def cache_lookups_total(name: str = "viper_rpc_server"):
+    return Counter(
+        name=f"{name}_cache_lookups",
+        documentation="Result cache lookups by trigger and result (hit or miss)",
+        labelnames=["trigger", "result"]
+    )
+
+
+def cache_evictions(name: str = "viper_rpc_server"):
+    return Gauge(
+        name=f"{name}_cache_evictions",
+        documentation="Entries evicted from a trigger's result cache to respect max_entries",
+        labelnames=["trigger"],
+        multiprocess_mode="livesum"
+    )
+
+
+def coalesced_requests_total(name: str = "viper_rpc_server"):
+    return Counter(
+        name=f"{name}_coalesced_requests",
+        documentation="Requests answered by sharing an identical call that was already in flight",
+        labelnames=["trigger"]
+    )
+
+
+def admitted_requests(name: str = "viper_rpc_server"):
+    return Gauge(
+        name=f"{name}_admitted_requests",
+        documentation="Requests currently admitted past admission control",
+        multiprocess_mode="livesum"
+    )
+
+
+def queued_requests(name: str = "viper_rpc_server"):
+    return Gauge(
+        name=f"{name}_queued_requests",
+        documentation="Requests waiting in the admission queue",
+        multiprocess_mode="livesum"
+    )
+
+
+def queue_wait_seconds(name: str = "viper_rpc_server"):
+    return Histogram(
+        name=f"{name}_queue_wait_seconds",
+        documentation="Time requests waited for admission, by trigger priority class",
+        labelnames=["priority"],
+        buckets=[0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05,
+                 0.1, 0.25, 0.5, 1, 2.5, 5]
+    )
+
+
+def trigger_label(trigger: Optional[str], server: Any) -> str:
+    # Unknown trigger names come straight from clients, so they share one value
+    return trigger if trigger in getattr(server, "triggers", ()) else "unknown"
+
+
+def client_label(client: Optional[Dict[str, Any]], known_ips: Set[str]) -> str:
+    """Client identity from a bounded set: the language, plus the ip of configured clients only."""
+    client = client or {}
+    language = client.get("language")
+    if language not in KNOWN_LANGUAGES:
+        language = "other"
+
+    ip = client.get("ip")
+    return f"{language}@{ip}" if ip in known_ips else language
+
+
+def error_category(category: Optional[str]) -> str:
+    return category if category in ERROR_CATEGORIES else "other"
+
+
+def enable_multiprocess():
+    # Metric values created from here on live in per-process mmap files that
+    # the metrics endpoint merges, so forked workers report into one registry.
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not path:
+        path = tempfile.mkdtemp(prefix="cromio-prometheus-")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+
+    for stale in glob.glob(os.path.join(path, "*.db")):
+        os.remove(stale)
+
+    values.ValueClass = values.MultiProcessValue()
+
+
+def mark_process_dead(pid: int):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
+
+
+_multiprocess_registry = None
+
+
+def collect_registry():
+    global _multiprocess_registry
+    if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        return REGISTRY
+
+    # The collector re-reads every worker's files on each scrape, so one registry is enough
+    if _multiprocess_registry is None:
+        _multiprocess_registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(_multiprocess_registry)
+
+    return _multiprocess_registry
+
+
+def register_route(path: str, handler: Callable[[], Tuple[bytes, str]]):
+    ROUTES[path] = handler
+
+
+def prettify(raw: bytes) -> bytes:
+    # Insert a blank line between metric families for human readers
+    return raw.replace(b"\n# HELP", b"\n\n# HELP")
+
+
+def start_metrics_server(port=2048, show_logs=True, pretty=False, compress=True):
     class MetricsHandler(BaseHTTPRequestHandler):
         def do_GET(self):
-            if self.path != "/metrics":
+            path = self.path.split("?", 1)[0]
+            if path == "/metrics":
+                output = generate_latest(collect_registry())
+                if pretty:
+                    output = prettify(output)
+                content_type = CONTENT_TYPE_LATEST
+            elif path in ROUTES:
+                output, content_type = ROUTES[path]()
+            else:
                 self.send_response(404)
                 self.end_headers()
                 return
 
-            # Pretty-format metrics: insert line breaks between metric families
-            raw = generate_latest().decode("utf-8")
-            pretty = "\n".join(
-                ["\n" + line if line.startswith("# HELP") else line
-                 for line in raw.strip().splitlines()]
-            )
-
             self.send_response(200)
-            self.send_header("Content-Type", CONTENT_TYPE_LATEST)
+            self.send_header("Content-Type", content_type)
+            if compress and "gzip" in self.headers.get("Accept-Encoding", ""):
+                output = gzip.compress(output, compresslevel=1)
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(output)))
             self.end_headers()
-            self.wfile.write(pretty.encode("utf-8"))
+            self.wfile.write(output)
 
         # 🔇 Suppress logs completely
         def log_message(self, _, *__):
             pass
 
     def run():
-        server = HTTPServer(("localhost", port), MetricsHandler)
+        # Scrapes from several Prometheus replicas are served concurrently
+        server = ThreadingHTTPServer(("localhost", port), MetricsHandler)
+        server.daemon_threads = True
         server.serve_forever()
 
     thread = Thread(target=run, daemon=True)
@@ -87,4 +242,3 @@ def start_metrics_server(port=2048, show_logs=True):
     if show_logs:
         print(
             f"🚀 Prometheus metrics exposed at: http://localhost:{port}/metrics")
-
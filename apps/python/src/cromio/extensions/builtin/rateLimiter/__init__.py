@@ -1,69 +1,86 @@
-import json
-from cromio.extensions.utils import BaseExtension
-from cromio.typing import OnRequestEndType
-from typing import Dict
-import threading
 import time
+from cromio.extensions.utils import BaseExtension, RequestRejectedError
+from cromio.extensions.builtin.rateLimiter.buckets import SharedBucketTable
+from cromio.typing import OnRequestAdmitType
+from typing import Dict, Optional, Tuple
 
 
-class RateLimitBucket:
-    def __init__(self, tokens: int, last_refill: float):
-        self.tokens = tokens
-        self.last_refill = last_refill
+RATE_LIMIT_KEYS = {"ip", "secret_key"}
+RATE_LIMIT_ALGORITHMS = {"token_bucket", "gcra"}
 
 
 class RequestRateLimiter(BaseExtension):
-    def __init__(self, limit: int = 100, interval: int = 60000):
+    def __init__(self, limit: int = 100, interval: int = 60000, key: str = "ip", trigger_limits: Optional[Dict[str, int]] = None, slots: int = 65536, algorithm: str = "token_bucket"):
         super().__init__()
+        if key not in RATE_LIMIT_KEYS:
+            raise ValueError(
+                f"Unknown rate limit key '{key}', expected one of: {', '.join(sorted(RATE_LIMIT_KEYS))}")
+
+        if algorithm not in RATE_LIMIT_ALGORITHMS:
+            raise ValueError(
+                f"Unknown rate limit algorithm '{algorithm}', expected one of: {', '.join(sorted(RATE_LIMIT_ALGORITHMS))}")
+
         self.limit = limit
         self.interval = interval  # in milliseconds
-        self.buckets: Dict[str, RateLimitBucket] = {}
+        self.key = key  # what identifies a client's bucket
+        # Extra per-client limits for individual triggers, on top of `limit`
+        self.trigger_limits: Dict[str, int] = dict(trigger_limits or {})
 
-        # Start the cleanup cron job
-        self._start_cron_cleanup()
+        # GCRA keeps a single timestamp per key; the token bucket keeps tokens and last refill
+        self.algorithm = algorithm
+        self._take = self._take_gcra if algorithm == "gcra" else self._take_token
 
-    def _start_cron_cleanup(self):
-        def cleanup():
-            now = time.time() * 1000  # milliseconds
-            expired = []
-            for ip, bucket in list(self.buckets.items()):
-                if now - bucket.last_refill > self.interval * 1.5:
-                    expired.append(ip)
-            for ip in expired:
-                del self.buckets[ip]
+        # Allocated now, before any fork, so all workers share one set of buckets
+        self.buckets = SharedBucketTable(
+            slots=slots, fields=1 if algorithm == "gcra" else 2)
 
-            # Schedule next run in 60 seconds
-            threading.Timer(60.0, cleanup).start()
+    def _identity(self, context: OnRequestAdmitType) -> str:
+        if self.key == "secret_key":
+            credentials = context.get("credentials", {})
+            return credentials.get("secret_key") or credentials.get("secretKey") or "*"
 
-        # First run
-        cleanup()
+        return context.get("request", {}).get("client", {}).get("ip") or "*"
 
-    def _refill_bucket(self, bucket: RateLimitBucket):
+    def _take_token(self, key: str, limit: int) -> bool:
         now = time.time() * 1000  # milliseconds
-        elapsed = now - bucket.last_refill
-        tokens_to_add = (elapsed / self.interval) * self.limit
-        if tokens_to_add >= 1:
-            bucket.tokens = min(self.limit, bucket.tokens + int(tokens_to_add))
-            bucket.last_refill = now
-
-    def _check_ip(self, ip: str) -> bool:
-        bucket = self.buckets.get(ip)
-        if not bucket:
-            bucket = RateLimitBucket(
-                tokens=self.limit, last_refill=time.time() * 1000)
-            self.buckets[ip] = bucket
-
-        self._refill_bucket(bucket)
-        if bucket.tokens >= 1:
-            bucket.tokens -= 1
-            return True
-        return False
-
-    def on_request_end(self, context: OnRequestEndType):
-        request = context.get("request", {})
-        client = request.get("client", {})
-        ip = client.get("ip", "*")
-
-        allowed = self._check_ip(ip)
-        if not allowed:
-            raise BaseException("Rate limit exceeded")
+
+        def take(state):
+            tokens, last_refill = state or (limit, now)
+            elapsed = now - last_refill
+            tokens_to_add = (elapsed / self.interval) * limit
+            if tokens_to_add >= 1:
+                tokens = min(limit, tokens + int(tokens_to_add))
+                last_refill = now
+
+            if tokens >= 1:
+                return (tokens - 1, last_refill), True
+            return (tokens, last_refill), False
+
+        # A bucket untouched for 1.5 intervals would be full again, so it counts as new
+        return self.buckets.update(key, take, stale_before=now - self.interval * 1.5)
+
+    def _take_gcra(self, key: str, limit: int) -> bool:
+        now = time.time() * 1000  # milliseconds
+        emission = self.interval / limit  # spacing between calls at the sustained rate
+        tolerance = self.interval - emission  # lets an idle client burst up to `limit` calls
+
+        def take(state):
+            # The stored value is the theoretical arrival time of the next call
+            arrival = max(state[0], now) if state else now
+            if arrival - now > tolerance:
+                return (arrival,), False
+            return (arrival + emission,), True
+
+        # Once the arrival time has passed, the key is back to a full burst: expire it
+        return self.buckets.update(key, take, stale_before=now)
+
+    def on_request_admit(self, context: OnRequestAdmitType):
+        identity = f"{self.key}:{self._identity(context)}"
+        if not self._take(identity, self.limit):
+            raise RequestRejectedError("🚫 Rate limit exceeded", "rate_limited")
+
+        trigger = context.get("request", {}).get("trigger")
+        trigger_limit = self.trigger_limits.get(trigger)
+        if trigger_limit is not None and not self._take(f"{identity}|{trigger}", trigger_limit):
+            raise RequestRejectedError(
+                f"🚫 Rate limit exceeded for trigger '{trigger}'", "rate_limited")
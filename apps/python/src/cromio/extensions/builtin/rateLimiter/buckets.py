@@ -0,0 +1,87 @@
+import mmap
+import struct
+import multiprocessing
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class SharedBucketTable:
+    """Fixed-size hash table of rate-limit state in anonymous shared memory.
+
+    It must be created before the server forks: every pre-fork worker then
+    maps the same pages, so a limit holds across processes. Each slot is a
+    64-bit key hash followed by `fields` floats, the last of which is a
+    timestamp used to expire and evict slots lazily.
+
+    When all probe slots around a key hold live keys, the least recently
+    touched one is evicted and that client starts over with a fresh bucket.
+    Evictions are counted in `stats`; a growing count means `slots` is too
+    small for the number of active clients.
+    """
+
+    PROBES = 8
+
+    def __init__(self, slots: int = 65536, fields: int = 2, shards: int = 64):
+        shards = max(1, min(shards, slots))
+        self.region = max(self.PROBES, slots // shards)
+        self.shards = max(1, slots // self.region)
+        self.slots = self.region * self.shards
+        self.slot = struct.Struct("<Q" + "d" * fields)
+        self.memory = mmap.mmap(-1, self.slots * self.slot.size)
+        # One lock per region; process-shared, so workers and threads both serialize on it
+        self.locks = [multiprocessing.Lock() for _ in range(self.shards)]
+        # Per-shard eviction counts, shared like the slots and updated under the shard's lock
+        self.counter = struct.Struct("<Q")
+        self.evictions = mmap.mmap(-1, self.shards * self.counter.size)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {"evictions": sum(count for count, in self.counter.iter_unpack(self.evictions))}
+
+    @staticmethod
+    def hash(key: str) -> int:
+        # Forked workers inherit the parent's hash seed, so hash() agrees across them
+        return hash(key) & 0xFFFFFFFFFFFFFFFF or 1  # 0 marks an empty slot
+
+    def update(self, key: str, fn: Callable[[Optional[Tuple[float, ...]]], Tuple[Tuple[float, ...], Any]], stale_before: float) -> Any:
+        """Applies fn to the key's state (None if new or expired), stores the new state and returns fn's result."""
+        hashed = self.hash(key)
+        home = hashed % self.slots
+        shard = home // self.region
+        base = shard * self.region
+        size = self.slot.size
+
+        with self.locks[shard]:
+            target, oldest, state = None, None, None
+            for probe in range(self.PROBES):
+                offset = (base + (home + probe) % self.region) * size
+                record = self.slot.unpack_from(self.memory, offset)
+                stored, touched = record[0], record[-1]
+
+                if stored == hashed:
+                    target = offset
+                    state = record[1:] if touched >= stale_before else None
+                    break
+
+                if stored == 0:
+                    # Slots are never cleared, so the key cannot be further along
+                    if target is None:
+                        target = offset
+                    break
+
+                if touched < stale_before:
+                    # Expired slot: reusable unless the key turns up further along
+                    if target is None:
+                        target = offset
+                elif oldest is None or touched < oldest[1]:
+                    oldest = (offset, touched)
+
+            if target is None:
+                # Probe window full of live keys: evict the least recently touched one
+                target = oldest[0]
+                offset = shard * self.counter.size
+                self.counter.pack_into(self.evictions, offset,
+                                       self.counter.unpack_from(self.evictions, offset)[0] + 1)
+
+            new_state, result = fn(state)
+            self.slot.pack_into(self.memory, target, hashed, *new_state)
+            return result
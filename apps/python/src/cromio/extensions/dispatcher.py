@@ -0,0 +1,72 @@
+import os
+import queue
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+class HookDispatcher:
+    """Runs deferred hooks on a background thread, off the request path."""
+
+    def __init__(self, max_queue: int = 10000, batch_size: int = 256):
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.stats: Dict[str, int] = {
+            "enqueued": 0, "dropped": 0, "processed": 0, "failed": 0}
+        self._lock = threading.Lock()
+        self._queue: Optional[queue.Queue] = None
+        self._pid: Optional[int] = None
+
+    def _events(self) -> queue.Queue:
+        # Threads do not survive fork(), so every worker process starts its own
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue(self.max_queue)
+                    threading.Thread(target=self._run, args=(self._queue,),
+                                     name="cromio-hooks", daemon=True).start()
+                    self._pid = os.getpid()
+
+        return self._queue
+
+    def submit(self, hook: Callable[[Any], None], context: Any) -> bool:
+        """Queues one hook call; returns False if the queue is full and it was dropped."""
+        try:
+            self._events().put_nowait((hook, context))
+        except queue.Full:
+            with self._lock:
+                self.stats["dropped"] += 1
+            return False
+
+        with self._lock:
+            self.stats["enqueued"] += 1
+        return True
+
+    def flush(self) -> None:
+        """Blocks until every queued hook call has run."""
+        if self._queue is not None and self._pid == os.getpid():
+            self._queue.join()
+
+    def _run(self, events: queue.Queue) -> None:
+        while True:
+            batch = [events.get()]
+            # Drain whatever else is waiting so a burst is handled in one wake-up
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(events.get_nowait())
+                except queue.Empty:
+                    break
+
+            failed = 0
+            for hook, context in batch:
+                try:
+                    hook(context)
+                except Exception as e:
+                    failed += 1
+                    print(f"❗ Error in background hook {getattr(hook, '__qualname__', hook)}: {e}")
+
+            with self._lock:
+                self.stats["processed"] += len(batch)
+                self.stats["failed"] += failed
+
+            for _ in batch:
+                events.task_done()
@@ -1,13 +1,29 @@
-from typing import Dict, List, Any, Protocol, runtime_checkable
+from typing import Callable, Dict, List, Any, Optional, Protocol, Tuple, runtime_checkable
+from cromio.constants import ALLOWED_EXTENSION_METHODS, BACKGROUND_EXTENSION_METHODS
+from cromio.extensions.dispatcher import HookDispatcher
+
+
+class RequestRejectedError(Exception):
+    """Raised from on_request_admit to refuse a call before it is validated or handled."""
+
+    def __init__(self, message: str, category: str = "rate_limited"):
+        super().__init__(message)
+        self.category = category
 
 
 class BaseExtension:
+    # Hooks listed here are queued to a background thread instead of running inline
+    background_hooks: Tuple[str, ...] = ()
+
     def inject_properties(self, server):
         return {"log": lambda msg: print(f"[LOG] {msg}")}
 
     def on_start(self, context):
         pass
 
+    def on_request_admit(self, context):
+        pass
+
     def on_request_begin(self, context):
         pass
 
@@ -17,25 +33,71 @@ class BaseExtension:
     def on_error(self, context):
         pass
 
+    def on_worker_start(self, context):
+        pass
+
+    def on_worker_exit(self, context):
+        pass
+
 
 @runtime_checkable
 class ExtensionSpec(Protocol):
     def inject_properties(self, server): ...
     def on_start(self, context): ...
+    def on_request_admit(self, context): ...
     def on_request_begin(self, context): ...
     def on_request_end(self, context): ...
     def on_error(self, context): ...
+    def on_worker_start(self, context): ...
+    def on_worker_exit(self, context): ...
+
+
+HOOK_NAMES = tuple(sorted(ALLOWED_EXTENSION_METHODS - {"inject_properties"}))
 
 
 class Extensions:
-    def __init__(self) -> None:
+    def __init__(self, dispatcher: Optional[HookDispatcher] = None) -> None:
         self.extensions: List[Any] = []
+        self.dispatcher = dispatcher or HookDispatcher()
+        # Bound hook methods per hook name, resolved once when an extension is added
+        self.hooks: Dict[str, Tuple[Callable, ...]] = {
+            name: () for name in HOOK_NAMES}
 
     def use_extension(self, ext: Any) -> None:
+        background = set(getattr(ext, "background_hooks", None) or ())
+        unsupported = background - BACKGROUND_EXTENSION_METHODS
+        if unsupported:
+            raise ValueError(
+                f"Hooks cannot run in the background: {', '.join(sorted(unsupported))}")
+
         self.extensions.append(ext)
 
-    def trigger_hook(self, name: str, context: Dict[str, Any] = {}) -> None:
-        for ext in self.extensions:
+        for name in HOOK_NAMES:
             hook = getattr(ext, name, None)
-            if callable(hook):
-                hook(dict(context))  # pass a shallow copy
+            if not callable(hook):
+                continue
+
+            # Hooks still bound to the BaseExtension no-ops are never called
+            if getattr(hook, "__func__", None) is getattr(BaseExtension, name):
+                continue
+
+            if name in background:
+                hook = self._deferred(hook)
+
+            self.hooks[name] += (hook,)
+
+    def _deferred(self, hook: Callable) -> Callable:
+        dispatcher = self.dispatcher
+
+        def deferred(context):
+            dispatcher.submit(hook, context)
+
+        return deferred
+
+    def has_hook(self, name: str) -> bool:
+        return bool(self.hooks.get(name))
+
+    def trigger_hook(self, name: str, context: Dict[str, Any] = {}) -> None:
+        # Every extension receives the same context object and must not mutate it
+        for hook in self.hooks.get(name, ()):
+            hook(context)
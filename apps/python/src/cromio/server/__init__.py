@@ -1,11 +1,22 @@
 import os
+import asyncio
 import sys
+import signal
 import threading
 import pydantic
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Callable, Dict, List, Optional, Set, TypeVar, Generic, TypedDict
+from cromio.constants import DEFAULT_PRIORITY, PRIORITY_CLASSES, SERVER_ENGINES
+from cromio.extensions.dispatcher import HookDispatcher
 from cromio.extensions.utils import Extensions
-from cromio.typing import ClientsType, TLSType
+from cromio.typing import AdmissionType, CacheType, ClientsType, CompressionType, TLSType
 from cromio.utils import Utils
+from cromio.utils.AdmissionControl import AdmissionControl
+from cromio.utils.AuthTable import AuthTable
+from cromio.utils.Codecs import CodecRegistry
+from cromio.utils.Compression import CompressionPolicy
+from cromio.utils.ResultCache import ResultCache
+from cromio.utils.SingleFlight import SingleFlight
 
 T = TypeVar("T", bound=Dict[str, Any])
 
@@ -15,14 +26,60 @@ class OptionsType(TypedDict, total=False):
     port: Optional[int]
     backlog: Optional[int]
     clients: Optional[List[ClientsType]]
+    engine: Optional[str]
+    concurrency: Optional[int]
+    keep_alive_timeout: Optional[float]
+    max_keep_alive_requests: Optional[int]
+    workers: Optional[int]
+    max_body_size: Optional[int]
+    compression: Optional[CompressionType]
+    max_batch_size: Optional[int]
+    handler_threads: Optional[int]
+    hook_queue_size: Optional[int]
+    auth_cache_ttl: Optional[float]
+    stage_timings: Optional[bool]
+    admission: Optional[AdmissionType]
 
 
 class Server(Generic[T]):
-    def __init__(self, tls: Optional[TLSType] = None, host: Optional[str] = "localhost", port: Optional[int] = 2000, backlog: Optional[int] = 128, clients: Optional[List[ClientsType]] = None):
+    def __init__(self, tls: Optional[TLSType] = None, host: Optional[str] = "localhost", port: Optional[int] = 2000, backlog: Optional[int] = 128, clients: Optional[List[ClientsType]] = None, engine: Optional[str] = "simple", concurrency: Optional[int] = 64, keep_alive_timeout: Optional[float] = 5, max_keep_alive_requests: Optional[int] = 100, workers: Optional[int] = 1, max_body_size: Optional[int] = 10 * 1024 * 1024, compression: Optional[CompressionType] = None, max_batch_size: Optional[int] = 100, handler_threads: Optional[int] = None, hook_queue_size: Optional[int] = 10000, auth_cache_ttl: Optional[float] = 0, stage_timings: Optional[bool] = False, admission: Optional[AdmissionType] = None):
         self.tls = tls
         self.port = port or 2000
         self.host = host or "localhost"
         self.backlog = backlog or 128
+        self.engine = engine or "simple"
+        self.concurrency = concurrency or 64
+        self.keep_alive_timeout = 5 if keep_alive_timeout is None else keep_alive_timeout
+        self.max_keep_alive_requests = max_keep_alive_requests or 100
+        self.max_body_size = max_body_size or 10 * 1024 * 1024
+        self.max_batch_size = max_batch_size or 100
+        self._batch_executor: Optional[ThreadPoolExecutor] = None
+        # Runs sync handlers and middlewares for the asyncio engine (None = executor default)
+        self.handler_threads = handler_threads
+        self._handler_executor: Optional[ThreadPoolExecutor] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.connection_stats: Dict[str, int] = {"opened": 0, "reused": 0}
+        # Per-stage request timings, passed to on_request_end as performance["stages"]
+        self.stage_timings = bool(stage_timings)
+        # Requests in flight per process; the excess queues, then gets a "busy" reply
+        self.admission = AdmissionControl(**(admission or {}))
+        self._stats_lock = threading.Lock()
+
+        if self.engine not in SERVER_ENGINES:
+            raise ValueError(
+                f"Unknown engine '{self.engine}', expected one of: {', '.join(sorted(SERVER_ENGINES))}")
+
+        if self.concurrency < 1:
+            raise ValueError("'concurrency' must be at least 1")
+
+        if self.handler_threads is not None and self.handler_threads < 1:
+            raise ValueError("'handler_threads' must be at least 1")
+
+        self.workers = workers or 1
+        self._worker_pids: Dict[int, int] = {}
+        if self.workers > 1 and not hasattr(os, "fork"):
+            raise ValueError("'workers' greater than 1 requires os.fork(), which is not available on this platform")
+
         self.clients:  Dict[str, dict] = {}
 
         if isinstance(clients, list):
@@ -37,16 +94,64 @@ class Server(Generic[T]):
 
                 self.clients[client.get('secret_key')] = client
 
+        # Matchers (including CIDR ranges) are parsed once here, not per request
+        self.auth = AuthTable(list(self.clients.values()))
+        # Seconds a passed auth check is reused on the same keep-alive connection (0 disables)
+        self.auth_cache_ttl = auth_cache_ttl or 0
+
         self._secret_trigger_handlers: dict[str, Callable] = {}
         self.triggers: Set[str] = set()
         self.global_middlewares: list[Callable] = []
-        self.extensions = Extensions()
+        self.extensions = Extensions(HookDispatcher(max_queue=hook_queue_size or 10000))
         self._schema = None
         self.schemas: dict[str, pydantic.BaseModel] = {}
-
-    def on_trigger(self, trigger_name: str, handler: Optional[Callable[[Dict[str, Any]], Any]] = None, schema: pydantic.BaseModel = None):
+        self._core_validator = Utils.combine_schema_with_core_schema(None)
+        self._validators: dict[str, type[pydantic.BaseModel]] = {}
+        self.codecs = CodecRegistry()
+        self.compression = CompressionPolicy(**(compression or {}))
+        self.result_caches: Dict[str, ResultCache] = {}
+        self.single_flights: Dict[str, SingleFlight] = {}
+        # Per-trigger priority class and concurrency limit (a bulkhead in front of its handler)
+        self.priorities: Dict[str, str] = {}
+        self.bulkheads: Dict[str, AdmissionControl] = {}
+
+    def _register_trigger_options(self, trigger_name: str, cache: Optional[CacheType] = None, coalesce: bool = False, priority: str = DEFAULT_PRIORITY, max_concurrency: Optional[int] = None):
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(
+                f"Unknown priority '{priority}', expected one of: {', '.join(PRIORITY_CLASSES)}")
+
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError("'max_concurrency' must be at least 1")
+
+        self.priorities[trigger_name] = priority
+        if max_concurrency is not None:
+            # Queued calls beyond the limit share the server-wide queue settings
+            self.bulkheads[trigger_name] = AdmissionControl(
+                max_concurrency, self.admission.max_queue, self.admission.queue_timeout)
+        else:
+            self.bulkheads.pop(trigger_name, None)
+
+        if cache:
+            self.result_caches[trigger_name] = ResultCache(**cache)
+        else:
+            self.result_caches.pop(trigger_name, None)
+
+        if coalesce:
+            self.single_flights[trigger_name] = SingleFlight()
+        else:
+            self.single_flights.pop(trigger_name, None)
+
+    def _register_schema(self, trigger_name: str, schema: pydantic.BaseModel):
+        self.schemas[trigger_name] = schema
+        self._validators[trigger_name] = Utils.combine_schema_with_core_schema(
+            schema)
+
+    def on_trigger(self, trigger_name: str, handler: Optional[Callable[[Dict[str, Any]], Any]] = None, schema: pydantic.BaseModel = None, cache: Optional[CacheType] = None, coalesce: bool = False, priority: str = DEFAULT_PRIORITY, max_concurrency: Optional[int] = None):
         if schema:
-            self.schemas[trigger_name] = schema
+            self._register_schema(trigger_name, schema)
+
+        self._register_trigger_options(
+            trigger_name, cache=cache, coalesce=coalesce, priority=priority, max_concurrency=max_concurrency)
 
         def decorator(fn: Callable[[Dict[str, Any]], Any]):
             self.triggers.add(trigger_name)
@@ -59,12 +164,15 @@ class Server(Generic[T]):
         triggers: Dict[str, list[Callable]] = definition.all()
 
         for name, handlers in triggers.items():
-            handler, schema = handlers
+            handler, schema, *options = handlers
             self.triggers.add(name)
             self._secret_trigger_handlers[name] = handler
 
             if schema:
-                self.schemas[name] = schema
+                self._register_schema(name, schema)
+
+            self._register_trigger_options(
+                name, **(options[0] if options else {}))
 
     def add_extension(self, *exts):
         for ext in exts:
@@ -82,6 +190,12 @@ class Server(Generic[T]):
             if watch:
                 def restart():
                     print("\n♻️ Restarting server...")
+                    for pid in list(self._worker_pids):
+                        try:
+                            os.kill(pid, signal.SIGTERM)
+                        except ProcessLookupError:
+                            pass
+
                     os.execv(sys.executable, [sys.executable] + sys.argv)
 
                 threading.Thread(
@@ -96,8 +210,15 @@ class Server(Generic[T]):
             server_config = {
                 "port": self.port,
                 "host": self.host,
+                "backlog": self.backlog,
                 "tls": self.tls,
                 "handler": handle_incoming_request,
+                "engine": self.engine,
+                "concurrency": self.concurrency,
+                "keep_alive_timeout": self.keep_alive_timeout,
+                "max_keep_alive_requests": self.max_keep_alive_requests,
+                "workers": self.workers,
+                "max_body_size": self.max_body_size,
             }
 
             Utils.start_server(self, server_config, func)
@@ -12,6 +12,23 @@ class TLSType(TypedDict):
     key: str
 
 
+class CompressionType(TypedDict, total=False):
+    threshold: int
+    level: int
+    encodings: List[str]
+
+
+class CacheType(TypedDict, total=False):
+    ttl: float
+    max_entries: int
+
+
+class AdmissionType(TypedDict, total=False):
+    max_in_flight: int
+    max_queue: int
+    queue_timeout: float
+
+
 class ClientsType(TypedDict):
     secret_key: str
     language: Optional[str]
@@ -23,6 +40,19 @@ class OptionsType(TypedDict, total=False):
     port: Optional[int]
     backlog: Optional[int]
     clients: Optional[List[ClientsType]]
+    engine: Optional[str]
+    concurrency: Optional[int]
+    keep_alive_timeout: Optional[float]
+    max_keep_alive_requests: Optional[int]
+    workers: Optional[int]
+    max_body_size: Optional[int]
+    compression: Optional[CompressionType]
+    max_batch_size: Optional[int]
+    handler_threads: Optional[int]
+    hook_queue_size: Optional[int]
+    auth_cache_ttl: Optional[float]
+    stage_timings: Optional[bool]
+    admission: Optional[AdmissionType]
 
 
 class CredentialsType(TypedDict):
@@ -31,16 +61,37 @@ class CredentialsType(TypedDict):
     ip: Optional[str]
 
 
+class BatchCallType(TypedDict):
+    trigger: str
+    body: dict
+
+
+class BatchRequestType(TypedDict):
+    batch: List[BatchCallType]
+    credentials: CredentialsType
+
+
 class OnTriggerType(TypedDict):
     body: dict
     client: CredentialsType
     trigger: str
     server: 'Server[T]'
+    raw: Optional[memoryview]
 
 
 class PerformanceType(TypedDict):
     time: float
     size: float
+    encoding: Optional[str]
+    reused: bool
+    cache: Optional[str]
+    coalesced: bool
+    coalesced_followers: int
+    streamed: Optional[int]
+    stages: Optional[Dict[str, float]]
+    request_size: Optional[int]
+    queue_wait: Optional[float]
+    priority: str
 
 
 class RequestType(TypedDict):
@@ -61,12 +112,31 @@ class OnRequestEndType(TypedDict):
     response: ResponseType
 
 
+class OnRequestAdmitType(TypedDict):
+    request: RequestType
+    credentials: CredentialsType
+    server: 'Server[T]'
+
+
 class OnRequestBeginType(TypedDict):
     request: RequestType
     server: 'Server[T]'
 
 
+class OnWorkerStartType(TypedDict):
+    server: 'Server[T]'
+    worker: int
+
+
+class OnWorkerExitType(TypedDict):
+    server: 'Server[T]'
+    worker: int
+    pid: int
+    exit_code: int
+
+
 class OnRequestErrorType(TypedDict):
     request: RequestType
     server: 'Server[T]'
     error: Any
+    category: str
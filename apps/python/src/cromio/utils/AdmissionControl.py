@@ -0,0 +1,219 @@
+import time
+import asyncio
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+from cromio.constants import DEFAULT_PRIORITY, PRIORITY_CLASSES
+
+
+# Reasons a request is shed, reported as the on_error category
+BUSY = "busy"
+EXPIRED = "deadline"
+
+
+class Waiter:
+    """A queued request; a released slot is handed to it directly."""
+
+    __slots__ = ("event", "future", "priority", "granted")
+
+    def __init__(self, priority: str, future: Optional[asyncio.Future] = None):
+        self.event = threading.Event() if future is None else None
+        self.future = future
+        self.priority = priority
+        self.granted = False
+
+    def wake(self) -> bool:
+        if self.future is not None:
+            # Timed out or cancelled on its event loop
+            if self.future.done():
+                return False
+            self.future.set_result(None)
+        else:
+            self.event.set()
+
+        return True
+
+    def grant(self) -> bool:
+        self.granted = self.wake()
+        return self.granted
+
+
+class AdmissionControl:
+    """Caps the requests in flight; the excess waits in a bounded queue or is turned away.
+
+    Waiters are admitted by priority class, then in arrival order. A request may carry
+    a deadline (time.time() seconds); one whose deadline passes before it is admitted
+    is shed instead of running for a client that has given up.
+
+    A streamed reply holds its slot only until the head is sent, so long-lived
+    streams and subscriptions do not starve other requests.
+    """
+
+    def __init__(self, max_in_flight: Optional[int] = None, max_queue: int = 100, queue_timeout: Optional[float] = None):
+        if max_in_flight is not None and max_in_flight < 1:
+            raise ValueError("'max_in_flight' must be at least 1")
+
+        if max_queue < 0:
+            raise ValueError("'max_queue' cannot be negative")
+
+        if queue_timeout is not None and queue_timeout <= 0:
+            raise ValueError("'queue_timeout' must be greater than 0")
+
+        self.max_in_flight = max_in_flight  # None admits everything
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout  # seconds a request may wait, besides its deadline
+        self.in_flight = 0
+        self.stats: Dict[str, int] = {
+            "admitted": 0, "queued": 0, BUSY: 0, EXPIRED: 0}
+        # One FIFO per priority class, most urgent first
+        self._queues: Dict[str, Deque[Waiter]] = {
+            priority: deque() for priority in PRIORITY_CLASSES}
+        self._queued = 0
+        self._lock = threading.Lock()
+        # Called with this instance after in_flight or the queue depth changed, outside the lock
+        self.listeners: List[Callable[["AdmissionControl"], None]] = []
+
+    def _changed(self):
+        for listener in self.listeners:
+            listener(self)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queued
+
+    def queue_depths(self) -> Dict[str, int]:
+        return {priority: len(queue) for priority, queue in self._queues.items()}
+
+    def _expired(self, deadline: Optional[float]) -> bool:
+        if deadline is None or time.time() < deadline:
+            return False
+
+        with self._lock:
+            self.stats[EXPIRED] += 1
+        return True
+
+    def _make_room(self, priority: str) -> bool:
+        # A full queue turns away its newest, least urgent waiter for a more urgent request
+        for lower in reversed(PRIORITY_CLASSES):
+            if lower == priority:
+                return False
+
+            queue = self._queues[lower]
+            if queue:
+                queue.pop().wake()
+                self._queued -= 1
+                return True
+
+        return False
+
+    def _enter(self, asynchronous: bool, priority: str) -> Tuple[Optional[str], Optional[Waiter]]:
+        """Takes a free slot, or queues a waiter; returns (shed reason, waiter)."""
+        with self._lock:
+            # Released slots go to waiters first, so a free slot means an empty queue
+            if self.in_flight < self.max_in_flight:
+                self.in_flight += 1
+                self.stats["admitted"] += 1
+                entered = None, None
+            elif self._queued >= self.max_queue and not self._make_room(priority):
+                self.stats[BUSY] += 1
+                return BUSY, None
+            else:
+                self.stats["queued"] += 1
+                waiter = Waiter(priority, asyncio.get_running_loop().create_future()
+                                if asynchronous else None)
+                self._queues[priority].append(waiter)
+                self._queued += 1
+                entered = None, waiter
+
+        self._changed()
+        return entered
+
+    def _withdraw(self, waiter: Waiter) -> bool:
+        """Takes a waiter out of the queue under the lock; False when it was already granted."""
+        if waiter.granted:
+            return False
+
+        try:
+            self._queues[waiter.priority].remove(waiter)
+            self._queued -= 1
+        except ValueError:
+            # Already made room for a more urgent request
+            pass
+        return True
+
+    def _leave_queue(self, waiter: Waiter, deadline: Optional[float]) -> Optional[str]:
+        with self._lock:
+            if not self._withdraw(waiter):
+                self.stats["admitted"] += 1
+                reason = None
+            else:
+                reason = EXPIRED if deadline is not None and time.time() >= deadline else BUSY
+                self.stats[reason] += 1
+
+        self._changed()
+        return reason
+
+    def _wait_time(self, deadline: Optional[float]) -> Optional[float]:
+        if deadline is None:
+            return self.queue_timeout
+
+        remaining = max(0.0, deadline - time.time())
+        return remaining if self.queue_timeout is None else min(remaining, self.queue_timeout)
+
+    def acquire(self, deadline: Optional[float] = None, priority: str = DEFAULT_PRIORITY) -> Optional[str]:
+        """Blocks until the request may run and returns None, or returns why it was shed."""
+        if self._expired(deadline):
+            return EXPIRED
+        if self.max_in_flight is None:
+            return None
+
+        shed, waiter = self._enter(False, priority)
+        if waiter is None:
+            return shed
+
+        waiter.event.wait(self._wait_time(deadline))
+        return self._leave_queue(waiter, deadline)
+
+    async def acquire_async(self, deadline: Optional[float] = None, priority: str = DEFAULT_PRIORITY) -> Optional[str]:
+        """acquire() for requests served on an event loop."""
+        if self._expired(deadline):
+            return EXPIRED
+        if self.max_in_flight is None:
+            return None
+
+        shed, waiter = self._enter(True, priority)
+        if waiter is None:
+            return shed
+
+        try:
+            await asyncio.wait_for(waiter.future, self._wait_time(deadline))
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            # The connection went away while queued; a slot already handed over is passed on
+            with self._lock:
+                withdrawn = self._withdraw(waiter)
+            if not withdrawn:
+                self.release()
+            else:
+                self._changed()
+            raise
+
+        return self._leave_queue(waiter, deadline)
+
+    def release(self):
+        if self.max_in_flight is None:
+            return
+
+        with self._lock:
+            self._hand_over()
+
+        self._changed()
+
+    def _hand_over(self):
+        for queue in self._queues.values():
+            while queue:
+                self._queued -= 1
+                if queue.popleft().grant():
+                    return
+        self.in_flight -= 1
@@ -0,0 +1,91 @@
+import hmac
+import hashlib
+import ipaddress
+from typing import Any, Dict, List, Optional
+
+
+class AuthClient:
+    """One configured client with its language and ip matchers resolved up front."""
+
+    def __init__(self, client: Dict[str, Any]):
+        self.client = client
+        self.secret_key = client["secret_key"].encode("utf-8")
+
+        language = client.get("language") or "*"
+        self.language: Optional[str] = None if language == "*" else language
+
+        ip = client.get("ip") or "*"
+        self.ip: Optional[str] = None
+        self.network = None
+        if ip != "*":
+            if "/" in ip:
+                self.network = ipaddress.ip_network(ip, strict=False)
+            else:
+                self.ip = ip
+
+    def allows_ip(self, ip: str) -> bool:
+        if self.network is not None:
+            try:
+                return ipaddress.ip_address(ip) in self.network
+            except ValueError:
+                return False
+
+        return self.ip is None or self.ip == ip
+
+
+class AuthTable:
+    def __init__(self, clients: Optional[List[Dict[str, Any]]] = None):
+        # Keyed by a digest of the secret so the lookup itself leaks nothing about it
+        self.clients: Dict[bytes, AuthClient] = {}
+        for client in clients or []:
+            entry = AuthClient(client)
+            self.clients[self.fingerprint(entry.secret_key)] = entry
+
+    @staticmethod
+    def fingerprint(secret_key: bytes) -> bytes:
+        return hashlib.blake2b(secret_key, digest_size=16).digest()
+
+    def authenticate(self, credentials: Dict[str, Any]) -> dict:
+        if not self.clients:
+            return {
+                "client": None,
+                "passed": True,
+                "message": None,
+            }
+
+        ip = credentials.get("ip", "*")
+        language = credentials.get("language", "*")
+        key_name = "secretKey" if language == "nodejs" else "secret_key"
+        secret_key = credentials.get(key_name)
+
+        entry = None
+        if isinstance(secret_key, str):
+            provided = secret_key.encode("utf-8")
+            entry = self.clients.get(self.fingerprint(provided))
+            # Constant-time check of the full key, never just its digest
+            if entry is not None and not hmac.compare_digest(entry.secret_key, provided):
+                entry = None
+
+        if entry is None:
+            return {
+                "passed": False,
+                "message": f"🚫 Authentication Failed: Client with ip={ip} not found in the list of authorized clients",
+            }
+
+        if entry.language is not None and entry.language != language:
+            return {
+                "passed": False,
+                "message": f"🚫 Invalid Language: '{language}' is not allowed for ip={ip} — expected '{entry.language}'",
+            }
+
+        if not entry.allows_ip(ip):
+            return {
+                "passed": False,
+                "message": f"🚫 Authentication Failed: Client with ip={ip} not authorized to access the server",
+            }
+
+        return {
+            "client": entry.client,
+            "passed": True,
+            "message": None,
+        }
@@ -0,0 +1,160 @@
+import json
+import base64
+from typing import Any, Dict, List, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+def _is_numpy(obj: Any) -> bool:
+    # Duck-typed so NumPy stays an optional dependency
+    return type(obj).__module__ == "numpy" and hasattr(obj, "shape")
+
+
+def _is_ndarray(obj: Any) -> bool:
+    return _is_numpy(obj) and obj.shape != ()
+
+
+def _is_numpy_scalar(obj: Any) -> bool:
+    return _is_numpy(obj) and obj.shape == ()
+
+
+class Codec:
+    name: str = ""
+    content_type: str = ""
+    aliases: tuple = ()
+
+    def encode(self, obj: Any) -> bytes:
+        raise NotImplementedError
+
+    def decode(self, data: bytes) -> Any:
+        raise NotImplementedError
+
+    def encode_array(self, items: List[bytes]) -> bytes:
+        """Joins already-encoded values into one encoded array."""
+        return self.encode([self.decode(item) for item in items])
+
+
+class JsonCodec(Codec):
+    name = "json"
+    content_type = "application/json"
+
+    @staticmethod
+    def _default(obj: Any):
+        if isinstance(obj, (bytes, bytearray, memoryview)):
+            return base64.b64encode(obj).decode("ascii")
+        if _is_ndarray(obj):
+            return obj.tolist()
+        if _is_numpy_scalar(obj):
+            return obj.item()
+        raise TypeError(
+            f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    def encode(self, obj: Any) -> bytes:
+        return json.dumps(obj, default=self._default).encode("utf-8")
+
+    def decode(self, data: bytes) -> Any:
+        # The stdlib parser does not take memoryviews, unlike orjson and msgpack
+        return json.loads(data.tobytes() if isinstance(data, memoryview) else data)
+
+    def encode_array(self, items: List[bytes]) -> bytes:
+        return b"[" + b",".join(items) + b"]"
+
+
+class OrjsonCodec(JsonCodec):
+    name = "orjson"
+    options = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    def encode(self, obj: Any) -> bytes:
+        try:
+            # NumPy arrays are written straight from their buffers, never as lists
+            return orjson.dumps(obj, default=self._default, option=self.options)
+        except orjson.JSONEncodeError:
+            # e.g. integers beyond 64 bits, which only the stdlib encoder handles
+            return super().encode(obj)
+
+    def decode(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+
+class MsgpackCodec(Codec):
+    name = "msgpack"
+    content_type = "application/msgpack"
+    aliases = ("application/x-msgpack", "application/vnd.msgpack")
+
+    @staticmethod
+    def _default(obj: Any):
+        if _is_ndarray(obj):
+            return {"dtype": str(obj.dtype), "shape": list(obj.shape), "data": obj.tobytes()}
+        if _is_numpy_scalar(obj):
+            return obj.item()
+        if isinstance(obj, memoryview):
+            return obj.tobytes()
+        raise TypeError(
+            f"Object of type {type(obj).__name__} is not msgpack serializable")
+
+    def encode(self, obj: Any) -> bytes:
+        return msgpack.packb(obj, default=self._default, use_bin_type=True)
+
+    def decode(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False)
+
+    def encode_array(self, items: List[bytes]) -> bytes:
+        header = msgpack.Packer().pack_array_header(len(items))
+        return header + b"".join(items)
+
+
+class CodecRegistry:
+    def __init__(self) -> None:
+        self.codecs: Dict[str, Codec] = {}
+        self.default: Codec = OrjsonCodec() if orjson else JsonCodec()
+
+        self.register(self.default)
+        if msgpack:
+            self.register(MsgpackCodec())
+
+    def register(self, codec: Codec) -> None:
+        for content_type in (codec.content_type, *codec.aliases):
+            self.codecs[content_type] = codec
+
+    def for_content_type(self, content_type: Optional[str]) -> Codec:
+        if not content_type:
+            return self.default
+
+        media_type = content_type.split(";", 1)[0].strip().lower()
+        return self.codecs.get(media_type, self.default)
+
+    def negotiate(self, accept: Optional[str], fallback: Optional[Codec] = None) -> Codec:
+        """Picks the response codec from an Accept header, preferring higher q-values."""
+        fallback = fallback or self.default
+        if not accept:
+            return fallback
+
+        ranked: List[tuple] = []
+        for index, part in enumerate(accept.split(",")):
+            media_type, *params = [p.strip() for p in part.split(";")]
+            quality = 1.0
+            for param in params:
+                if param.startswith("q="):
+                    try:
+                        quality = float(param[2:])
+                    except ValueError:
+                        quality = 0.0
+
+            if quality > 0:
+                ranked.append((-quality, index, media_type.lower()))
+
+        for _, _, media_type in sorted(ranked):
+            if media_type in self.codecs:
+                return self.codecs[media_type]
+            if media_type in ("*/*", "application/*"):
+                return fallback
+
+        return fallback
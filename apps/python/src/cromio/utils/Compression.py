@@ -0,0 +1,86 @@
+import gzip
+import zlib
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+DEFAULT_ENCODINGS = ["zstd", "br", "gzip", "deflate"]
+
+
+class CompressionPolicy:
+    def __init__(self, threshold: int = 1024, level: int = 6, encodings: Optional[List[str]] = None):
+        self.threshold = threshold
+        self.level = level
+        self.compressors: Dict[str, Callable[[bytes], bytes]] = {}
+        # A ZstdCompressor must not be shared between threads, so each one gets its own
+        self._zstd = threading.local()
+
+        available = {
+            "gzip": lambda data: gzip.compress(data, compresslevel=level, mtime=0),
+            "deflate": lambda data: zlib.compress(data, level),
+        }
+        if zstandard:
+            available["zstd"] = self._zstd_compress
+        if brotli:
+            available["br"] = lambda data: brotli.compress(
+                data, quality=min(level, 11))
+
+        # Keep the server's preference order; unknown or missing encodings are skipped
+        for name in (encodings or DEFAULT_ENCODINGS):
+            if name in available:
+                self.compressors[name] = available[name]
+
+    def _zstd_compress(self, data: bytes) -> bytes:
+        compressor = getattr(self._zstd, "compressor", None)
+        if compressor is None:
+            compressor = self._zstd.compressor = zstandard.ZstdCompressor(level=self.level)
+
+        return compressor.compress(data)
+
+    def negotiate(self, accept_encoding: Optional[str]) -> Optional[str]:
+        """Returns the preferred encoding the client accepts, or None for identity."""
+        if not self.compressors:
+            return None
+
+        if accept_encoding is None:
+            # No header means any encoding is acceptable; gzip is what every client speaks
+            return "gzip" if "gzip" in self.compressors else next(iter(self.compressors))
+
+        accepted: Dict[str, float] = {}
+        for part in accept_encoding.split(","):
+            name, *params = [p.strip() for p in part.split(";")]
+            quality = 1.0
+            for param in params:
+                if param.startswith("q="):
+                    try:
+                        quality = float(param[2:])
+                    except ValueError:
+                        quality = 0.0
+            if name:
+                accepted[name.lower()] = quality
+
+        wildcard = accepted.get("*", 0.0)
+        best, best_quality = None, 0.0
+        for name in self.compressors:
+            quality = accepted.get(name, wildcard)
+            if quality > best_quality:
+                best, best_quality = name, quality
+
+        return best
+
+    def compress(self, data: bytes, encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+        # Tiny bodies grow once headers and checksums are added, so send them as-is
+        if encoding is None or len(data) < self.threshold or encoding not in self.compressors:
+            return data, None
+
+        return self.compressors[encoding](data), encoding
@@ -0,0 +1,63 @@
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class CacheEntry:
+    def __init__(self, result: Any, expires: float):
+        self.result = result
+        self.expires = expires
+        # Encoded bodies keyed by (codec name, content encoding)
+        self.variants: Dict[Tuple[str, Optional[str]], Tuple[bytes, Optional[str]]] = {}
+
+
+class ResultCache:
+    def __init__(self, ttl: float = 30, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(body: Any) -> str:
+        """Canonical hash of a trigger body, independent of key order."""
+        canonical = json.dumps(body, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+
+            if entry.expires <= time.monotonic():
+                # Expired entries are dropped lazily, on the lookup that finds them
+                del self.entries[key]
+                self.stats["expirations"] += 1
+                self.stats["misses"] += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry
+
+    def put(self, key: str, result: Any) -> CacheEntry:
+        entry = CacheEntry(result, time.monotonic() + self.ttl)
+        with self._lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self.entries.clear()
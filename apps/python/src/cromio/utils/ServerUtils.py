@@ -3,12 +3,85 @@ import socket
 import ssl
 import json
 import gzip
+import zlib
 import base64
+import os
 import time
-from typing import Any, Callable, Dict, Optional
+import signal
+import asyncio
+import inspect
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional, Union
 from watchdog.events import FileSystemEventHandler
 from watchdog.observers import Observer
+from cromio.constants import DEFAULT_PRIORITY, ENVELOPE_CONTENT_TYPE, STREAM_MESSAGE_TYPES
+from cromio.extensions.utils import RequestRejectedError
 from cromio.typing import OnTriggerType, OptionsType, CredentialsType
+from cromio.utils.AdmissionControl import BUSY, AdmissionControl
+from cromio.utils.Codecs import Codec, JsonCodec
+from cromio.utils.ResultCache import ResultCache
+from cromio.utils.Streaming import StreamEncoder, StreamedBody, is_stream
+
+
+MAX_HEADER_SIZE = 65536
+DEFAULT_MAX_BODY_SIZE = 10 * 1024 * 1024
+
+
+class RequestTooLargeError(Exception):
+    pass
+
+
+class TriggerCall:
+    """State of one trigger call as it moves through the request pipeline."""
+
+    def __init__(self, server: Any, trigger_name: str, payload: Any, credentials: Dict[str, Any], codec: Codec, encoding: Optional[str], start: float, connection: Optional[Dict[str, Any]], raw: Optional[memoryview] = None):
+        self.trigger_name = trigger_name
+        self.payload = payload
+        self.credentials = credentials
+        self.codec = codec
+        self.encoding = encoding
+        self.start = start
+        self.connection = connection
+        self.context = OnTriggerType(
+            trigger=trigger_name, body=payload, credentials=credentials, server=server, raw=raw
+        )
+        self._request: Optional[Dict[str, Any]] = None
+        self.cache: Optional[ResultCache] = server.result_caches.get(trigger_name)
+        self.flight = server.single_flights.get(trigger_name)
+        self.priority: str = server.priorities.get(trigger_name, DEFAULT_PRIORITY)
+        # Seconds spent in admission, or None when the call was not subject to it
+        self.queue_wait: Optional[float] = connection.get(
+            "queue_wait") if connection else None
+        self.body_key = ResultCache.key(
+            payload) if self.cache or self.flight else None
+        self.entry = None
+        self.cache_status: Optional[str] = None
+        self.coalesced = False
+        self.followers = 0
+        # None streams generator results only, True streams any result, False never streams
+        self.stream: Optional[bool] = None
+        # Subscribers get every streamed item flushed as soon as it is produced
+        self.live = False
+        # Per-stage nanoseconds for this request, or None when stage timings are off
+        self.timings: Optional[Dict[str, int]] = connection.get(
+            "timings") if connection else None
+
+    @property
+    def request(self) -> Dict[str, Any]:
+        # Built on first use and shared, read-only, by every hook fired for this call
+        if self._request is None:
+            self._request = {
+                "trigger": self.trigger_name,
+                "body": self.payload,
+                "client": {
+                    "ip": self.credentials.get("ip"),
+                    "language": self.credentials.get("language")
+                }
+            }
+
+        return self._request
 
 
 class ServerUtils:
@@ -33,62 +106,336 @@ class ServerUtils:
 
     @staticmethod
     def _validate_schema(server, trigger_name: str, payload: dict):
-        schema = server.schemas.get(trigger_name)
-        Schemas = ServerUtils.combine_schema_with_core_schema(schema)
+        # Validators are compiled once at registration; the hot path only looks them up
+        validator = server._validators.get(trigger_name, server._core_validator)
 
-        if Schemas:
-            try:
-                Schemas(**payload)
-                return None
-            except pydantic.ValidationError as e:
-                error_messages = {
-                    ".".join(str(i) for i in err["loc"]): err["msg"] for err in e.errors()
-                }
-                return {"error": {"messages": error_messages}}
-        return None
+        try:
+            validator.model_validate(payload)
+            return None
+        except pydantic.ValidationError as e:
+            error_messages = {
+                ".".join(str(i) for i in err["loc"]): err["msg"] for err in e.errors()
+            }
+            return {"error": {"messages": error_messages}}
 
     @staticmethod
-    def _format_http_response(body: bytes) -> bytes:
+    def _format_http_response(body: bytes, keep_alive: bool = False, content_type: str = "application/json", content_encoding: Optional[str] = None) -> bytes:
+        encoding_header = f"Content-Encoding: {content_encoding}\r\n" if content_encoding else ""
         return (
             "HTTP/1.1 200 OK\r\n"
             f"Content-Length: {len(body)}\r\n"
-            "Content-Type: application/json\r\n"
-            "Content-Encoding: gzip\r\n"
-            "Connection: close\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"{encoding_header}"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
             "\r\n"
         ).encode("utf-8") + body
 
     @staticmethod
-    def _parse_http_request(data_bytes: bytes) -> tuple[Any, Any, Any]:
+    def _format_stream_head(keep_alive: bool, content_type: str, content_encoding: Optional[str]) -> bytes:
+        encoding_header = f"Content-Encoding: {content_encoding}\r\n" if content_encoding else ""
+        return (
+            "HTTP/1.1 200 OK\r\n"
+            "Transfer-Encoding: chunked\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"{encoding_header}"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            "\r\n"
+        ).encode("utf-8")
+
+    @staticmethod
+    def _send_stream(conn: socket.socket, stream: StreamedBody, keep_alive: bool):
+        head_sent = False
         try:
-            parts = data_bytes.split(b"\r\n\r\n", 1)
-            if len(parts) < 2:
-                print("⚠️ Incomplete HTTP request received")
-                return [None, None, None], {}, {}
-
-            headers_part, body_part = parts
-            header_lines = headers_part.decode(
-                "utf-8", errors="replace").split("\r\n")
-            request_line = header_lines[0].split()
-            headers = {
-                k.lower(): v
-                for line in header_lines[1:]
-                if ": " in line
-                for k, v in [line.split(": ", 1)]
-            }
+            conn.sendall(ServerUtils._format_stream_head(
+                keep_alive, stream.content_type, stream.content_encoding))
+            head_sent = True
+            if stream.on_head is not None:
+                stream.on_head()
+            for chunk in stream.chunks:
+                # An empty chunk would end the body, so held-back output is skipped
+                if chunk:
+                    conn.sendall(b"%x\r\n%b\r\n" % (len(chunk), chunk))
+            conn.sendall(b"0\r\n\r\n")
+        finally:
+            if not head_sent and stream.abort is not None:
+                stream.abort()
+            stream.chunks.close()
 
-            is_gzip = body_part[:2] == b"\x1f\x8b"
-            try:
-                body = gzip.decompress(body_part) if is_gzip else body_part
-                json_body = json.loads(body.decode("utf-8"))
-            except Exception as e:
-                print(f"❌ Error decoding request body: {e}")
-                json_body = {}
+    @staticmethod
+    async def _send_stream_async(writer: asyncio.StreamWriter, stream: StreamedBody, keep_alive: bool):
+        head_sent = False
+        try:
+            writer.write(ServerUtils._format_stream_head(
+                keep_alive, stream.content_type, stream.content_encoding))
+            head_sent = True
+            if stream.on_head is not None:
+                stream.on_head()
+            async for chunk in stream.chunks:
+                if chunk:
+                    writer.write(b"%x\r\n%b\r\n" % (len(chunk), chunk))
+                    # Waiting for the socket keeps a slow reader from buffering the whole stream
+                    await writer.drain()
+            writer.write(b"0\r\n\r\n")
+        finally:
+            if not head_sent and stream.abort is not None:
+                await stream.abort()
+            await stream.chunks.aclose()
+
+    @staticmethod
+    def _read_http_request(conn: socket.socket, buffer: bytearray, max_body_size: int, timings: Optional[Dict[str, int]] = None) -> tuple[Optional[list], Dict[str, str], Optional[bytearray], bytearray]:
+        """Reads one request framed by Content-Length, returning it and any pipelined leftover."""
+        # Read time starts at the first byte, so keep-alive idle time is not counted
+        first_byte = time.perf_counter_ns() if timings is not None and buffer else 0
+        while (head_end := buffer.find(b"\r\n\r\n")) < 0:
+            if len(buffer) > MAX_HEADER_SIZE:
+                raise RequestTooLargeError(
+                    f"Request headers exceed {MAX_HEADER_SIZE} bytes")
+
+            chunk = conn.recv(65536)
+            if not chunk:
+                return None, {}, None, bytearray()
+            if timings is not None and not first_byte:
+                first_byte = time.perf_counter_ns()
+            buffer += chunk
+
+        if timings is not None:
+            parse_start = time.perf_counter_ns()
+        request_line, headers = ServerUtils._parse_http_head(
+            bytes(buffer[:head_end]))
+        if timings is not None:
+            ServerUtils._add_timing(timings, "parse", parse_start)
+        body_start = head_end + 4
+        content_length = int(headers.get("content-length") or 0)
+
+        if content_length > max_body_size:
+            raise RequestTooLargeError(
+                f"Request body of {content_length} bytes exceeds max_body_size of {max_body_size} bytes")
+
+        # Make sure the gzip magic bytes are available before picking a reader
+        while len(buffer) < body_start + min(content_length, 2):
+            chunk = conn.recv(65536)
+            if not chunk:
+                return None, {}, None, bytearray()
+            buffer += chunk
+
+        received = buffer[body_start:body_start + content_length]
+        leftover = buffer[body_start + content_length:]
+
+        if received[:2] == b"\x1f\x8b":
+            body = ServerUtils._read_gzip_body(
+                conn, received, content_length, max_body_size, timings)
+        else:
+            body = ServerUtils._read_identity_body(
+                conn, received, content_length)
+
+        if body is None:
+            return None, {}, None, bytearray()
+
+        if timings is not None:
+            # Parsing and decompression happen while reading, so they are taken out
+            ServerUtils._add_timing(timings, "read", first_byte)
+            timings["read"] -= timings["parse"] + timings.get("decompress", 0)
+
+        return request_line, headers, body, leftover
+
+    @staticmethod
+    def _read_identity_body(conn: socket.socket, received: bytearray, content_length: int) -> Optional[bytearray]:
+        # Preallocate the whole body and let the kernel copy straight into it
+        body = bytearray(content_length)
+        view = memoryview(body)
+        filled = len(received)
+        view[:filled] = received
+
+        while filled < content_length:
+            read = conn.recv_into(view[filled:], content_length - filled)
+            if not read:
+                return None
+            filled += read
+
+        return body
+
+    @staticmethod
+    def _read_gzip_body(conn: socket.socket, received: bytearray, content_length: int, max_body_size: int, timings: Optional[Dict[str, int]] = None) -> Optional[bytearray]:
+        # Inflate while reading so the compressed upload is never held in full
+        inflater = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        body = bytearray()
+
+        def inflate(data):
+            ServerUtils._inflate_into(body, inflater, data, max_body_size, timings)
+
+        inflate(received)
+        remaining = content_length - len(received)
+        scratch = memoryview(bytearray(min(remaining, 65536)))
+
+        while remaining > 0:
+            read = conn.recv_into(scratch, min(remaining, len(scratch)))
+            if not read:
+                return None
+            inflate(scratch[:read])
+            remaining -= read
+
+        body.extend(inflater.flush())
+        return body
+
+    @staticmethod
+    def _inflate_into(body: bytearray, inflater: Any, data: bytes, max_body_size: int, timings: Optional[Dict[str, int]] = None):
+        if timings is not None:
+            start = time.perf_counter_ns()
+            body.extend(inflater.decompress(data, max_body_size + 1 - len(body)))
+            ServerUtils._add_timing(timings, "decompress", start)
+        else:
+            body.extend(inflater.decompress(data, max_body_size + 1 - len(body)))
+        if len(body) > max_body_size:
+            raise RequestTooLargeError(
+                f"Decompressed request body exceeds max_body_size of {max_body_size} bytes")
+
+    @staticmethod
+    async def _read_http_request_async(reader: asyncio.StreamReader, max_body_size: int, idle_timeout: Optional[float] = None, timings: Optional[Dict[str, int]] = None) -> tuple[Optional[list], Dict[str, str], Optional[bytearray]]:
+        """Async counterpart of _read_http_request; the stream keeps any pipelined leftover."""
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), idle_timeout)
+        except asyncio.LimitOverrunError:
+            raise RequestTooLargeError(
+                f"Request headers exceed {MAX_HEADER_SIZE} bytes")
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            return None, {}, None
+
+        # The head's arrival cannot be told apart from idle time, so reading is timed from here
+        if timings is not None:
+            head_read = time.perf_counter_ns()
+        request_line, headers = ServerUtils._parse_http_head(head[:-4])
+        if timings is not None:
+            ServerUtils._add_timing(timings, "parse", head_read)
+        content_length = int(headers.get("content-length") or 0)
 
-            return request_line, json_body, headers
+        if content_length > max_body_size:
+            raise RequestTooLargeError(
+                f"Request body of {content_length} bytes exceeds max_body_size of {max_body_size} bytes")
+
+        try:
+            received = await reader.readexactly(min(content_length, 2))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return None, {}, None
+
+        gzipped = received == b"\x1f\x8b"
+        if gzipped:
+            inflater = zlib.decompressobj(zlib.MAX_WBITS | 16)
+            body = bytearray()
+            ServerUtils._inflate_into(body, inflater, received, max_body_size, timings)
+        else:
+            body = bytearray(content_length)
+            body[:len(received)] = received
+
+        filled = len(received)
+        while filled < content_length:
+            chunk = await reader.read(min(content_length - filled, 65536))
+            if not chunk:
+                return None, {}, None
+
+            if gzipped:
+                ServerUtils._inflate_into(body, inflater, chunk, max_body_size, timings)
+            else:
+                body[filled:filled + len(chunk)] = chunk
+            filled += len(chunk)
+
+        if gzipped:
+            body.extend(inflater.flush())
+
+        if timings is not None:
+            ServerUtils._add_timing(timings, "read", head_read)
+            timings["read"] -= timings["parse"] + timings.get("decompress", 0)
+
+        return request_line, headers, body
+
+    @staticmethod
+    def _wants_keep_alive(request_line: list, headers: Dict[str, str]) -> bool:
+        connection = headers.get("connection", "").lower()
+        if request_line[-1] == "HTTP/1.0":
+            return connection == "keep-alive"
+
+        return connection != "close"
+
+    @staticmethod
+    def _parse_http_head(head: bytes) -> tuple[list, Dict[str, str]]:
+        header_lines = head.decode("utf-8", errors="replace").split("\r\n")
+        request_line = header_lines[0].split()
+        headers = {
+            k.lower(): v
+            for line in header_lines[1:]
+            if ": " in line
+            for k, v in [line.split(": ", 1)]
+        }
+
+        return request_line or [None, None, None], headers
+
+    @staticmethod
+    def _decode_body(body: bytearray, codec: Codec) -> Any:
+        try:
+            return codec.decode(body) if body else {}
+        except Exception as e:
+            print(f"❌ Error decoding request body: {e}")
+            return {}
+
+    @staticmethod
+    def _decode_request(server: Any, headers: Dict[str, str], body: bytearray) -> tuple[Any, Codec]:
+        content_type = headers.get("content-type")
+        if content_type and content_type.split(";", 1)[0].strip().lower() == ENVELOPE_CONTENT_TYPE:
+            return ServerUtils._decode_envelope(server, body)
+
+        codec = server.codecs.for_content_type(content_type)
+        return ServerUtils._decode_body(body, codec), codec
+
+    @staticmethod
+    def _decode_envelope(server: Any, body: bytearray) -> tuple[Dict[str, Any], Codec]:
+        """Splits a compressed-envelope body into header and payload, decoding each exactly once.
+
+        Layout after the transport has inflated it: a 4-byte big-endian header
+        length, a JSON header ({trigger, credentials, content_type}) and the raw
+        payload bytes, encoded with the header's content_type.
+        """
+        try:
+            view = memoryview(body)
+            header_end = 4 + int.from_bytes(view[:4], "big")
+            header = json.loads(bytes(view[4:header_end]))
+            # A slice of the request buffer: handlers can forward it without copying
+            raw = view[header_end:]
+            codec = server.codecs.for_content_type(header.get("content_type"))
+
+            return {
+                "trigger": header.get("trigger", ""),
+                "credentials": header.get("credentials", {}),
+                "body": codec.decode(raw) if len(raw) else {},
+                "raw": raw
+            }, codec
         except Exception as e:
-            print(f"‼️ Unexpected error parsing HTTP request: {e}")
-            return [None, None, None], {}, {}
+            print(f"❌ Error decoding request envelope: {e}")
+            return {}, server.codecs.default
+
+    @staticmethod
+    def _encode_response(server: Any, codec: Codec, encoding: Optional[str], data: Any, timings: Optional[Dict[str, int]] = None) -> tuple[bytes, Optional[str]]:
+        if timings is None:
+            return server.compression.compress(codec.encode(data), encoding)
+
+        start = time.perf_counter_ns()
+        encoded = codec.encode(data)
+        compress_start = ServerUtils._add_timing(timings, "serialize", start)
+        compressed = server.compression.compress(encoded, encoding)
+        ServerUtils._add_timing(timings, "compress", compress_start)
+        return compressed
+
+    @staticmethod
+    def _add_timing(timings: Dict[str, int], stage: str, start: int) -> int:
+        """Adds the time since start to a stage and returns now, the start of the next one."""
+        now = time.perf_counter_ns()
+        timings[stage] = timings.get(stage, 0) + now - start
+        return now
+
+    @staticmethod
+    def _stage_seconds(timings: Optional[Dict[str, int]]) -> Optional[Dict[str, float]]:
+        if timings is None:
+            return None
+
+        return {stage: elapsed / 1e9 for stage, elapsed in timings.items()}
 
     @staticmethod
     def start_file_watcher(restart_callback: Callable[[], None]):
@@ -105,74 +452,42 @@ class ServerUtils:
 
     @staticmethod
     def validate_credentials(credentials: CredentialsType, server: Any) -> dict:
-        if bool(server.clients) is False:
-            return {
-                "client": None,
-                "passed": True,
-                "message": None,
-            }
+        return server.auth.authenticate(credentials)
 
-        ip = credentials.get("ip", "*")
-        language = credentials.get("language", "*")
-
-        secret_key = credentials.get(
-            "secretKey" if language == "nodejs" else "secret_key", None
-        )
-
-        client = server.clients.get(secret_key, None)
-        client_ip = client.get("ip", "*")
-        client_language = client.get("language", None)
-        client_secret_key = client.get("secret_key", None)
-
-        if (not client):
-            return {
-                "passed": False,
-                "message": f"🚫 Authentication Failed: Client with ip={ip} not found in the list of authorized clients",
-            }
+    @staticmethod
+    def _authenticate(server: Any, credentials: CredentialsType, connection: Optional[Dict[str, Any]] = None) -> dict:
+        if not server.auth_cache_ttl or connection is None:
+            return server.auth.authenticate(credentials)
 
-        if (client_language != language and client_language != "*"):
-            return {
-                "passed": False,
-                "message": f"🚫 Invalid Language: '{language}' is not allowed for ip={ip} — expected '{client.get("language")}'",
-            }
+        # Keep-alive clients send the same credentials on every call, so a
+        # passed check is reused on that connection for a short while.
+        try:
+            key = (credentials.get("ip"), credentials.get("language"),
+                   credentials.get("secret_key"), credentials.get("secretKey"))
+            cached = connection.get("auth", {}).get(key)
+        except TypeError:
+            return server.auth.authenticate(credentials)
 
-        if (client_ip != ip and client_ip != "*"):
-            return {
-                "passed": False,
-                "message": f"🚫 Authentication Failed: Client with ip={ip} not authorized to access the server",
-            }
+        now = time.monotonic()
+        if cached is not None and cached[1] > now:
+            return cached[0]
 
-        if (client_secret_key != secret_key):
-            return {
-                "passed": False,
-                "message": f"🚫 Authentication Failed: Client at ip={ip} provided an invalid {'secretKey' if language == 'nodejs' else 'secret_key'}",
-            }
+        auth = server.auth.authenticate(credentials)
+        if auth.get("passed", False):
+            cache = connection.setdefault("auth", {})
+            if len(cache) >= 8:
+                cache.clear()
+            cache[key] = (auth, now + server.auth_cache_ttl)
 
-        return {
-            "client": client,
-            "passed": True,
-            "message": None,
-        }
+        return auth
 
     @staticmethod
-    def handle_request(server, body: Dict[str, Any], reply: Callable[[bytes], None]):
-        start = time.perf_counter()
-        trigger_name = body.get("trigger", "")
-        payload = body.get("body", {})
-        credentials = body.get("credentials", {})
-
-        auth = ServerUtils.validate_credentials(credentials, server)
-        if auth.get("passed", False):
-            has_error = ServerUtils._validate_schema(
-                server,
-                trigger_name,
-                payload={
-                    **credentials,
-                    **payload
-                }
-            )
-            if has_error:
-                server.extensions.trigger_hook("on_error", {
+    def _begin_trigger(server, trigger_name: str, payload: Any, credentials: Dict[str, Any], codec: Codec, encoding: Optional[str], start: float, connection: Optional[Dict[str, Any]] = None, raw: Optional[memoryview] = None) -> Union[TriggerCall, tuple[bytes, Optional[str]]]:
+        """Validates one authenticated call; returns its state, or the encoded error response."""
+        if server.extensions.has_hook("on_request_admit"):
+            # The body is already read and decoded; validation and the handler have not run yet
+            try:
+                server.extensions.trigger_hook("on_request_admit", {
                     "request": {
                         "trigger": trigger_name,
                         "body": payload,
@@ -181,32 +496,18 @@ class ServerUtils:
                             "language": credentials.get("language")
                         }
                     },
-                    "server": server,
-                    "error": has_error
+                    "credentials": credentials,
+                    "server": server
                 })
-                return reply(gzip.compress(json.dumps(has_error).encode("utf-8")))
+            except RequestRejectedError as e:
+                return ServerUtils._reject_request(server, trigger_name, payload, str(e), e.category, codec, encoding, credentials)
 
-            if "message" in payload and isinstance(payload["message"], str):
-                try:
-                    decoded = base64.b64decode(payload["message"])
-                    payload = json.loads(
-                        gzip.decompress(decoded).decode("utf-8"))
-                except Exception as e:
-                    server.extensions.trigger_hook("on_error", {
-                        "request": {
-                            "trigger": trigger_name,
-                            "body": payload,
-                            "client": {
-                                "ip": credentials.get("ip"),
-                                "language": credentials.get("language")
-                            }
-                        },
-                        "server": server,
-                        "error": f"Error decompressing payload message: {e}"
-                    })
-                    print(f"❗ Error decompressing payload message: {e}")
-
-            if not trigger_name or trigger_name not in server._secret_trigger_handlers:
+        # Legacy base64+gzip envelope: unwrap it first so the schema sees the real payload
+        if "message" in payload and isinstance(payload["message"], str):
+            try:
+                decoded = base64.b64decode(payload["message"])
+                payload = json.loads(gzip.decompress(decoded))
+            except Exception as e:
                 server.extensions.trigger_hook("on_error", {
                     "request": {
                         "trigger": trigger_name,
@@ -217,15 +518,42 @@ class ServerUtils:
                         }
                     },
                     "server": server,
-                    "error": f"Unknown or missing trigger: {trigger_name}"
+                    "error": f"Error decompressing payload message: {e}",
+                    "category": "decompression"
                 })
-                return reply(gzip.compress(json.dumps({"error": f"Unknown or missing trigger: {trigger_name}"}).encode("utf-8")))
+                print(f"❗ Error decompressing payload message: {e}")
 
-            context = OnTriggerType(
-                trigger=trigger_name, body=payload, credentials=credentials, server=server
-            )
+        timings = connection.get("timings") if connection else None
+        if timings is not None:
+            validation_start = time.perf_counter_ns()
+        has_error = ServerUtils._validate_schema(
+            server,
+            trigger_name,
+            payload={
+                **credentials,
+                **payload
+            }
+        )
+        if timings is not None:
+            ServerUtils._add_timing(timings, "validation", validation_start)
+        if has_error:
+            server.extensions.trigger_hook("on_error", {
+                "request": {
+                    "trigger": trigger_name,
+                    "body": payload,
+                    "client": {
+                        "ip": credentials.get("ip"),
+                        "language": credentials.get("language")
+                    }
+                },
+                "server": server,
+                "error": has_error,
+                "category": "validation"
+            })
+            return ServerUtils._encode_response(server, codec, encoding, has_error)
 
-            server.extensions.trigger_hook("on_request_begin", {
+        if not trigger_name or trigger_name not in server._secret_trigger_handlers:
+            server.extensions.trigger_hook("on_error", {
                 "request": {
                     "trigger": trigger_name,
                     "body": payload,
@@ -234,138 +562,1149 @@ class ServerUtils:
                         "language": credentials.get("language")
                     }
                 },
+                "server": server,
+                "error": f"Unknown or missing trigger: {trigger_name}",
+                "category": "unknown_trigger"
+            })
+            return ServerUtils._encode_response(server, codec, encoding, {"error": f"Unknown or missing trigger: {trigger_name}"})
+
+        call = TriggerCall(server, trigger_name, payload,
+                           credentials, codec, encoding, start, connection, raw)
+
+        if server.extensions.has_hook("on_request_begin"):
+            server.extensions.trigger_hook("on_request_begin", {
+                "request": call.request,
                 "server": server
             })
 
-            try:
-                for middleware in server.global_middlewares:
-                    middleware(context)
+        return call
 
-                result = server._secret_trigger_handlers[trigger_name](context)
-                compressed = gzip.compress(json.dumps(
-                    {"data": result}).encode("utf-8"))
+    @staticmethod
+    def _lookup_cache(call: TriggerCall) -> bool:
+        if call.cache is None:
+            return False
 
-                server.extensions.trigger_hook("on_request_end", {
-                    "request": {
-                        "trigger": trigger_name,
-                        "client": {
-                            "ip": credentials.get("ip"),
-                            "language": credentials.get("language")
-                        },
-                        "body": payload,
-                    },
-                    "server": server,
-                    "response": {
-                        "status": 200,
-                        "data": result,
-                        "performance": {
-                            "size": len(compressed),
-                            "time": time.perf_counter() - start
-                        }
+        call.entry = call.cache.get(call.body_key)
+        call.cache_status = "hit" if call.entry else "miss"
+        return call.entry is not None
+
+    @staticmethod
+    def _invoke_trigger(server, call: TriggerCall) -> Any:
+        timings = call.timings
+        if timings is not None:
+            start = time.perf_counter_ns()
+        for middleware in server.global_middlewares:
+            ServerUtils._call_sync(server, middleware, call.context)
+        if timings is not None:
+            start = ServerUtils._add_timing(timings, "middlewares", start)
+
+        if ServerUtils._lookup_cache(call):
+            return call.entry.result
+
+        handler = server._secret_trigger_handlers[call.trigger_name]
+        try:
+            if call.flight is None:
+                return ServerUtils._call_handler(server, handler, call)
+
+            # Identical calls already in flight wait for that run instead of repeating it
+            result, call.coalesced, call.followers = call.flight.do(
+                call.body_key, lambda: ServerUtils._call_handler(server, handler, call))
+            return result
+        finally:
+            if timings is not None:
+                ServerUtils._add_timing(timings, "handler", start)
+
+    @staticmethod
+    async def _invoke_trigger_async(server, call: TriggerCall) -> Any:
+        timings = call.timings
+        if timings is not None:
+            start = time.perf_counter_ns()
+        for middleware in server.global_middlewares:
+            await ServerUtils._call_async(server, middleware, call.context)
+        if timings is not None:
+            start = ServerUtils._add_timing(timings, "middlewares", start)
+
+        if ServerUtils._lookup_cache(call):
+            return call.entry.result
+
+        handler = server._secret_trigger_handlers[call.trigger_name]
+        try:
+            if call.flight is None:
+                return await ServerUtils._call_handler_async(server, handler, call)
+
+            result, call.coalesced, call.followers = await call.flight.do_async(
+                call.body_key, lambda: ServerUtils._call_handler_async(server, handler, call))
+            return result
+        finally:
+            if timings is not None:
+                ServerUtils._add_timing(timings, "handler", start)
+
+    @staticmethod
+    def _must_collect(call: TriggerCall) -> bool:
+        # Cached, coalesced and batched results are reused or nested, so a generator is drained first
+        return call.stream is False or call.cache is not None or call.flight is not None
+
+    @staticmethod
+    def _call_handler(server, handler: Callable, call: TriggerCall) -> Any:
+        result = ServerUtils._call_sync(server, handler, call.context)
+        if is_stream(result) and ServerUtils._must_collect(call):
+            result = list(ServerUtils._iterate(server, result))
+
+        return result
+
+    @staticmethod
+    async def _call_handler_async(server, handler: Callable, call: TriggerCall) -> Any:
+        result = await ServerUtils._call_async(server, handler, call.context)
+        if is_stream(result) and ServerUtils._must_collect(call):
+            result = [item async for item in ServerUtils._iterate_async(server, result)]
+
+        return result
+
+    @staticmethod
+    async def _next_async(source: Any, done: Any) -> Any:
+        try:
+            return await source.__anext__()
+        except StopAsyncIteration:
+            return done
+
+    @staticmethod
+    def _iterate(server, source: Any) -> Iterator[Any]:
+        if not inspect.isasyncgen(source):
+            yield from source
+            return
+
+        # Async generators on a thread-based engine advance on the shared background loop
+        loop = ServerUtils._event_loop(server)
+        done = object()
+        while True:
+            item = asyncio.run_coroutine_threadsafe(
+                ServerUtils._next_async(source, done), loop).result()
+            if item is done:
+                return
+            yield item
+
+    @staticmethod
+    async def _iterate_async(server, source: Any) -> AsyncIterator[Any]:
+        if inspect.isasyncgen(source):
+            async for item in source:
+                yield item
+            return
+
+        if not inspect.isgenerator(source):
+            for item in source:
+                yield item
+            return
+
+        # Each step of a sync generator may block, so it runs on the handler pool
+        loop = asyncio.get_running_loop()
+        executor = ServerUtils._handler_executor(server)
+        done = object()
+        while True:
+            item = await loop.run_in_executor(executor, next, source, done)
+            if item is done:
+                return
+            yield item
+
+    @staticmethod
+    def _close_source(server, source: Any):
+        # Stops a generator left unfinished by an error or a client that went away
+        try:
+            if inspect.isgenerator(source):
+                source.close()
+            elif inspect.isasyncgen(source):
+                asyncio.run_coroutine_threadsafe(
+                    ServerUtils._await(source.aclose()), ServerUtils._event_loop(server)).result()
+        except Exception:
+            pass
+
+    @staticmethod
+    async def _close_source_async(source: Any):
+        try:
+            if inspect.isasyncgen(source):
+                await source.aclose()
+            elif inspect.isgenerator(source):
+                source.close()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _finish_trigger(server, call: TriggerCall, result: Any, asynchronous: bool = False) -> tuple[Union[bytes, StreamedBody], Optional[str]]:
+        if call.cache is not None and call.entry is None and not call.coalesced:
+            call.entry = call.cache.put(call.body_key, result)
+
+        if call.stream or (call.stream is None and is_stream(result)):
+            return ServerUtils._stream_response(server, call, result, asynchronous)
+
+        variant = (call.codec.name, call.encoding)
+        if call.entry is not None and variant in call.entry.variants:
+            # Cache hit in this exact format: no handler, no encoding, no compression
+            compressed, content_encoding = call.entry.variants[variant]
+        else:
+            compressed, content_encoding = ServerUtils._encode_response(
+                server, call.codec, call.encoding, {"data": result}, call.timings)
+            if call.entry is not None:
+                call.entry.variants[variant] = (compressed, content_encoding)
+
+        if server.extensions.has_hook("on_request_end"):
+            server.extensions.trigger_hook("on_request_end", {
+                "request": call.request,
+                "server": server,
+                "response": {
+                    "status": 200,
+                    "data": result,
+                    "performance": {
+                        "size": len(compressed),
+                        "encoding": content_encoding,
+                        "time": time.perf_counter() - call.start,
+                        "reused": (call.connection or {}).get("requests", 1) > 1,
+                        "cache": call.cache_status,
+                        "coalesced": call.coalesced,
+                        "coalesced_followers": call.followers,
+                        "streamed": None,
+                        "stages": ServerUtils._stage_seconds(call.timings),
+                        "request_size": (call.connection or {}).get("request_size"),
+                        "queue_wait": call.queue_wait,
+                        "priority": call.priority
                     }
-                })
+                }
+            })
 
-                return reply(compressed)
-            except Exception as e:
-                server.extensions.trigger_hook("on_error", {
-                    "request": {
-                        "trigger": trigger_name,
-                        "body": payload,
-                        "client": {
-                            "ip": credentials.get("ip"),
-                            "language": credentials.get("language")
-                        },
-                    },
-                    "server": server,
-                    "error": str(e)
-                })
-                return reply(gzip.compress(json.dumps({"error": str(e)}).encode("utf-8")))
+        return compressed, content_encoding
 
+    @staticmethod
+    def _stream_response(server, call: TriggerCall, result: Any, asynchronous: bool) -> tuple[StreamedBody, Optional[str]]:
+        # Items are framed as JSON, so streams ignore a negotiated binary codec
+        codec = call.codec if isinstance(call.codec, JsonCodec) else server.codecs.default
+        if call.credentials.get("language") == "nodejs":
+            # Node's triggerStream gunzips the body itself and expects no Content-Encoding
+            encoder = StreamEncoder(codec, "gzip", server.compression.level)
+            content_encoding = None
         else:
-            message = auth.get("message")
-            server.extensions.trigger_hook("on_error", {
-                "request": {
-                    "trigger": trigger_name,
-                    "body": payload,
-                    "client": {}
-                },
+            encoder = StreamEncoder(codec, call.encoding, server.compression.level)
+            content_encoding = encoder.encoding
+
+        if asynchronous:
+            chunks = ServerUtils._stream_chunks_async(server, call, result, encoder)
+
+            async def abort():
+                ServerUtils._report_disconnect(server, call)
+                await ServerUtils._close_source_async(result)
+        else:
+            chunks = ServerUtils._stream_chunks(server, call, result, encoder)
+
+            def abort():
+                ServerUtils._report_disconnect(server, call)
+                ServerUtils._close_source(server, result)
+
+        return StreamedBody(chunks, codec.content_type, content_encoding, abort), content_encoding
+
+    @staticmethod
+    def _stream_chunks(server, call: TriggerCall, source: Any, encoder: StreamEncoder) -> Iterator[bytes]:
+        array = isinstance(source, (list, tuple)) or is_stream(source)
+        live = call.live and is_stream(source)
+        error = None
+        try:
+            try:
+                if array:
+                    yield encoder.open()
+                    for item in ServerUtils._iterate(server, source):
+                        yield encoder.item(item, live)
+                else:
+                    yield encoder.value(source)
+            except Exception as e:
+                error = e
+                ServerUtils._report_error(server, call, e)
+            finally:
+                ServerUtils._close_source(server, source)
+
+            yield encoder.close(error, array)
+        except GeneratorExit:
+            # The transport closed us early: the client went away mid-stream
+            if error is None:
+                ServerUtils._report_disconnect(server, call)
+            raise
+
+        if error is None:
+            ServerUtils._end_stream(server, call, encoder)
+
+    @staticmethod
+    async def _stream_chunks_async(server, call: TriggerCall, source: Any, encoder: StreamEncoder) -> AsyncIterator[bytes]:
+        array = isinstance(source, (list, tuple)) or is_stream(source)
+        live = call.live and is_stream(source)
+        error = None
+        try:
+            try:
+                if array:
+                    yield encoder.open()
+                    async for item in ServerUtils._iterate_async(server, source):
+                        yield encoder.item(item, live)
+                else:
+                    yield encoder.value(source)
+            except Exception as e:
+                error = e
+                ServerUtils._report_error(server, call, e)
+            finally:
+                await ServerUtils._close_source_async(source)
+
+            yield encoder.close(error, array)
+        except (GeneratorExit, asyncio.CancelledError):
+            if error is None:
+                ServerUtils._report_disconnect(server, call)
+            raise
+
+        if error is None:
+            ServerUtils._end_stream(server, call, encoder)
+
+    @staticmethod
+    def _end_stream(server, call: TriggerCall, encoder: StreamEncoder):
+        if server.extensions.has_hook("on_request_end"):
+            server.extensions.trigger_hook("on_request_end", {
+                "request": call.request,
                 "server": server,
-                "error": message
+                "response": {
+                    "status": 200,
+                    # Items were never held together, so only their count is reported
+                    "data": None,
+                    "performance": {
+                        "size": encoder.size,
+                        "encoding": encoder.encoding,
+                        "time": time.perf_counter() - call.start,
+                        "reused": (call.connection or {}).get("requests", 1) > 1,
+                        "cache": call.cache_status,
+                        "coalesced": call.coalesced,
+                        "coalesced_followers": call.followers,
+                        "streamed": encoder.items,
+                        "stages": ServerUtils._stage_seconds(call.timings),
+                        "request_size": (call.connection or {}).get("request_size"),
+                        "queue_wait": call.queue_wait,
+                        "priority": call.priority
+                    }
+                }
             })
-            return reply(gzip.compress(json.dumps({"error": message}).encode("utf-8")))
 
     @staticmethod
-    def start_server(server: Any, options: OptionsType, callback: Callable[[str], None]):
-        HOST, PORT = options.get("host", "0.0.0.0"), options.get("port", 2000)
-        is_tls = options.get("tls") is not None
+    def _report_error(server, call: TriggerCall, error: Exception):
+        server.extensions.trigger_hook("on_error", {
+            "request": call.request,
+            "server": server,
+            "error": str(error),
+            "category": "handler"
+        })
 
-        def serve(sock):
-            url = f"{'https' if is_tls else 'http'}://{HOST}:{PORT}"
-            callback(url)
+    @staticmethod
+    def _report_disconnect(server, call: TriggerCall):
+        # on_request_begin already fired, so hooks must still see the call end
+        server.extensions.trigger_hook("on_error", {
+            "request": call.request,
+            "server": server,
+            "error": "Client disconnected before the stream ended",
+            "category": "disconnected"
+        })
 
-            while True:
+    @staticmethod
+    def _fail_trigger(server, call: TriggerCall, error: Exception) -> tuple[bytes, Optional[str]]:
+        ServerUtils._report_error(server, call, error)
+        return ServerUtils._encode_response(server, call.codec, call.encoding, {"error": str(error)})
+
+    @staticmethod
+    def _run_trigger(server, trigger_name: str, payload: Any, credentials: Dict[str, Any], codec: Codec, encoding: Optional[str], start: float, connection: Optional[Dict[str, Any]] = None, raw: Optional[memoryview] = None, stream: Optional[bool] = None, live: bool = False, queue_wait: Optional[float] = None) -> tuple[Union[bytes, StreamedBody], Optional[str]]:
+        """Runs one authenticated trigger call and returns its encoded response body."""
+        call = ServerUtils._begin_trigger(
+            server, trigger_name, payload, credentials, codec, encoding, start, connection, raw)
+        if not isinstance(call, TriggerCall):
+            return call
+
+        call.stream = stream
+        call.live = live
+        if queue_wait is not None:
+            # Batched calls are admitted one by one, so their wait is not on the connection
+            call.queue_wait = queue_wait
+        try:
+            return ServerUtils._finish_trigger(server, call, ServerUtils._invoke_trigger(server, call))
+        except Exception as e:
+            return ServerUtils._fail_trigger(server, call, e)
+
+    @staticmethod
+    async def _run_trigger_async(server, trigger_name: str, payload: Any, credentials: Dict[str, Any], codec: Codec, encoding: Optional[str], start: float, connection: Optional[Dict[str, Any]] = None, raw: Optional[memoryview] = None, stream: Optional[bool] = None, live: bool = False, queue_wait: Optional[float] = None) -> tuple[Union[bytes, StreamedBody], Optional[str]]:
+        call = ServerUtils._begin_trigger(
+            server, trigger_name, payload, credentials, codec, encoding, start, connection, raw)
+        if not isinstance(call, TriggerCall):
+            return call
+
+        call.stream = stream
+        call.live = live
+        if queue_wait is not None:
+            # Batched calls are admitted one by one, so their wait is not on the connection
+            call.queue_wait = queue_wait
+        try:
+            return ServerUtils._finish_trigger(server, call, await ServerUtils._invoke_trigger_async(server, call), asynchronous=True)
+        except Exception as e:
+            return ServerUtils._fail_trigger(server, call, e)
+
+    @staticmethod
+    async def _await(awaitable: Awaitable) -> Any:
+        return await awaitable
+
+    @staticmethod
+    def _call_sync(server, fn: Callable, context: OnTriggerType) -> Any:
+        result = fn(context)
+        if inspect.isawaitable(result):
+            # Coroutines on a thread-based engine run on one shared background loop
+            result = asyncio.run_coroutine_threadsafe(
+                ServerUtils._await(result), ServerUtils._event_loop(server)).result()
+
+        return result
+
+    @staticmethod
+    async def _call_async(server, fn: Callable, context: OnTriggerType) -> Any:
+        if inspect.iscoroutinefunction(fn):
+            return await fn(context)
+
+        # Sync handlers may block, so they run on the handler pool instead of the loop
+        result = await asyncio.get_running_loop().run_in_executor(
+            ServerUtils._handler_executor(server), fn, context)
+        if inspect.isawaitable(result):
+            result = await result
+
+        return result
+
+    @staticmethod
+    def _event_loop(server) -> asyncio.AbstractEventLoop:
+        with server._stats_lock:
+            if server._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever,
+                                 name="cromio-loop", daemon=True).start()
+                server._loop = loop
+
+        return server._loop
+
+    @staticmethod
+    def _handler_executor(server) -> ThreadPoolExecutor:
+        with server._stats_lock:
+            if server._handler_executor is None:
+                server._handler_executor = ThreadPoolExecutor(
+                    max_workers=server.handler_threads, thread_name_prefix="cromio-handler")
+
+        return server._handler_executor
+
+    @staticmethod
+    def _batch_executor(server) -> ThreadPoolExecutor:
+        # Created lazily so pre-fork workers each start their own threads
+        with server._stats_lock:
+            if server._batch_executor is None:
+                server._batch_executor = ThreadPoolExecutor(
+                    max_workers=server.concurrency, thread_name_prefix="cromio-batch")
+
+        return server._batch_executor
+
+    @staticmethod
+    def _reject_request(server, trigger_name: Optional[str], payload: Any, message: Any, category: str, codec: Codec, encoding: Optional[str], credentials: Optional[Dict[str, Any]] = None) -> tuple[bytes, Optional[str]]:
+        server.extensions.trigger_hook("on_error", {
+            "request": {
+                "trigger": trigger_name,
+                "body": payload,
+                "client": {
+                    "ip": credentials.get("ip"),
+                    "language": credentials.get("language")
+                } if isinstance(credentials, dict) else {}
+            },
+            "server": server,
+            "error": message,
+            "category": category
+        })
+        return ServerUtils._encode_response(server, codec, encoding, {"error": message})
+
+    @staticmethod
+    def _check_batch(server, body: Dict[str, Any], codec: Codec, encoding: Optional[str], connection: Optional[Dict[str, Any]] = None) -> Optional[tuple[bytes, Optional[str]]]:
+        """Returns the encoded error for a malformed or unauthenticated batch, else None."""
+        calls = body.get("batch")
+        if not isinstance(calls, list) or len(calls) > server.max_batch_size:
+            message = f"'batch' must be a list of at most {server.max_batch_size} calls"
+            return ServerUtils._reject_request(server, None, None, message, "bad_batch", codec, encoding, body.get("credentials"))
+
+        # Credentials are checked once for the whole batch
+        auth = ServerUtils._authenticate(
+            server, body.get("credentials", {}), connection)
+        if not auth.get("passed", False):
+            return ServerUtils._reject_request(server, None, None, auth.get("message"), "auth", codec, encoding, body.get("credentials"))
+
+        return None
+
+    @staticmethod
+    def handle_batch(server, body: Dict[str, Any], reply: Callable[[bytes, Optional[str]], None], connection: Optional[Dict[str, Any]] = None, codec: Optional[Codec] = None, encoding: Optional[str] = "gzip"):
+        codec = codec or server.codecs.default
+        rejected = ServerUtils._check_batch(server, body, codec, encoding, connection)
+        if rejected:
+            return reply(*rejected)
+
+        calls = body["batch"]
+        credentials = body.get("credentials", {})
+        if connection:
+            # Batched calls share one read and one response, so they report no stage breakdown
+            connection["timings"] = None
+
+        deadline = ServerUtils._deadline(body)
+
+        def run(call: Any) -> bytes:
+            if not isinstance(call, dict):
+                call = {}
+
+            # Each call is admitted like a single request, so a batch cannot bypass any limit
+            priority, bulkhead = ServerUtils._scheduling(server, call)
+            queued_at = time.perf_counter()
+            shed = ServerUtils._admit(server, bulkhead, deadline, priority)
+            queue_wait = None if ServerUtils._unlimited(
+                server, bulkhead, deadline) else time.perf_counter() - queued_at
+            if shed:
+                return ServerUtils._shed_request(server, call, shed, codec, None, credentials)[0]
+
+            try:
+                # Each call fires its own hooks, so per-trigger metrics stay accurate
+                item, _ = ServerUtils._run_trigger(
+                    server, call.get("trigger", ""), call.get("body", {}), credentials,
+                    codec, None, time.perf_counter(), connection, stream=False, queue_wait=queue_wait
+                )
+            except Exception as e:
+                # A malformed call fails on its own instead of failing the whole batch
+                item = ServerUtils._reject_request(
+                    server, call.get("trigger"), call.get("body"), str(e), "bad_batch", codec, None, credentials)[0]
+            finally:
+                ServerUtils._leave(server, bulkhead)
+            return item
+
+        if len(calls) > 1:
+            items = list(ServerUtils._batch_executor(server).map(run, calls))
+        else:
+            items = [run(call) for call in calls]
+
+        return reply(*server.compression.compress(codec.encode_array(items), encoding))
+
+    @staticmethod
+    async def handle_batch_async(server, body: Dict[str, Any], reply: Callable[[bytes, Optional[str]], None], connection: Optional[Dict[str, Any]] = None, codec: Optional[Codec] = None, encoding: Optional[str] = "gzip"):
+        codec = codec or server.codecs.default
+        rejected = ServerUtils._check_batch(server, body, codec, encoding, connection)
+        if rejected:
+            return reply(*rejected)
+
+        credentials = body.get("credentials", {})
+        if connection:
+            connection["timings"] = None
+
+        deadline = ServerUtils._deadline(body)
+
+        async def run(call: Any) -> bytes:
+            if not isinstance(call, dict):
+                call = {}
+
+            priority, bulkhead = ServerUtils._scheduling(server, call)
+            queued_at = time.perf_counter()
+            shed = await ServerUtils._admit_async(server, bulkhead, deadline, priority)
+            queue_wait = None if ServerUtils._unlimited(
+                server, bulkhead, deadline) else time.perf_counter() - queued_at
+            if shed:
+                return ServerUtils._shed_request(server, call, shed, codec, None, credentials)[0]
+
+            try:
+                item, _ = await ServerUtils._run_trigger_async(
+                    server, call.get("trigger", ""), call.get("body", {}), credentials,
+                    codec, None, time.perf_counter(), connection, stream=False, queue_wait=queue_wait
+                )
+            except Exception as e:
+                item = ServerUtils._reject_request(
+                    server, call.get("trigger"), call.get("body"), str(e), "bad_batch", codec, None, credentials)[0]
+            finally:
+                ServerUtils._leave(server, bulkhead)
+            return item
+
+        items = await asyncio.gather(*(run(call) for call in body["batch"]))
+        return reply(*server.compression.compress(codec.encode_array(list(items)), encoding))
+
+    @staticmethod
+    def _unwrap_message(body: Dict[str, Any]) -> Dict[str, Any]:
+        """Unwraps a top-level {"message": base64(gzip(JSON))} body, as sent by Node's triggerStream."""
+        if "trigger" in body or not isinstance(body.get("message"), str):
+            return body
+
+        try:
+            message = json.loads(gzip.decompress(
+                base64.b64decode(body["message"])))
+        except Exception as e:
+            print(f"❌ Error decoding request message: {e}")
+            return body
+
+        if not isinstance(message, dict):
+            return body
+
+        return {
+            "trigger": message.get("trigger", ""),
+            "body": message.get("payload", message.get("body", {})),
+            "credentials": message.get("credentials", {}),
+            "type": message.get("type"),
+            "deadline": message.get("deadline")
+        }
+
+    @staticmethod
+    def _deadline(body: Dict[str, Any]) -> Optional[float]:
+        """The client's deadline from the envelope (Unix epoch milliseconds), in time.time() seconds."""
+        deadline = body.get("deadline")
+        if isinstance(deadline, (int, float)) and not isinstance(deadline, bool):
+            return deadline / 1000
+
+        return None
+
+    @staticmethod
+    def _shed_request(server, body: Dict[str, Any], reason: str, codec: Optional[Codec], encoding: Optional[str], credentials: Optional[Dict[str, Any]] = None) -> tuple[bytes, Optional[str]]:
+        message = "Server is busy, try again later" if reason == BUSY else "Request deadline expired before it could run"
+        # Batched calls carry no credentials of their own, so the batch passes its own
+        return ServerUtils._reject_request(server, body.get("trigger"), body.get("body"), message, reason, codec or server.codecs.default, encoding, credentials or body.get("credentials"))
+
+    @staticmethod
+    def _scheduling(server, body: Dict[str, Any]) -> tuple[str, Optional[AdmissionControl]]:
+        """The priority class and bulkhead of the called trigger; batched calls are scheduled one by one."""
+        trigger_name = body.get("trigger")
+        if not isinstance(trigger_name, str):
+            return DEFAULT_PRIORITY, None
+
+        return server.priorities.get(trigger_name, DEFAULT_PRIORITY), server.bulkheads.get(trigger_name)
+
+    @staticmethod
+    def _admit(server, bulkhead: Optional[AdmissionControl], deadline: Optional[float], priority: str) -> Optional[str]:
+        # The trigger's own limit is taken first, so a flooded trigger queues without holding server-wide slots
+        if bulkhead is not None:
+            shed = bulkhead.acquire(deadline, priority)
+            if shed:
+                return shed
+
+        try:
+            shed = server.admission.acquire(deadline, priority)
+        except BaseException:
+            if bulkhead is not None:
+                bulkhead.release()
+            raise
+
+        if shed and bulkhead is not None:
+            bulkhead.release()
+        return shed
+
+    @staticmethod
+    async def _admit_async(server, bulkhead: Optional[AdmissionControl], deadline: Optional[float], priority: str) -> Optional[str]:
+        if bulkhead is not None:
+            shed = await bulkhead.acquire_async(deadline, priority)
+            if shed:
+                return shed
+
+        try:
+            shed = await server.admission.acquire_async(deadline, priority)
+        except BaseException:
+            # Cancelled while queued server-wide: the trigger's slot would otherwise be lost
+            if bulkhead is not None:
+                bulkhead.release()
+            raise
+
+        if shed and bulkhead is not None:
+            bulkhead.release()
+        return shed
+
+    @staticmethod
+    def _unlimited(server, bulkhead: Optional[AdmissionControl], deadline: Optional[float]) -> bool:
+        # Nothing can queue or shed the call, so it skips admission and reports no queue wait
+        return deadline is None and bulkhead is None and server.admission.max_in_flight is None
+
+    @staticmethod
+    def _leave(server, bulkhead: Optional[AdmissionControl]):
+        server.admission.release()
+        if bulkhead is not None:
+            bulkhead.release()
+
+    @staticmethod
+    def _releasing(server, bulkhead: Optional[AdmissionControl], reply: Callable) -> tuple[Callable, Callable[[], None]]:
+        """Wraps reply so a streamed response gives back its slots once its head is sent."""
+        # Streams and subscriptions can stay open indefinitely and would otherwise hold every slot
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                ServerUtils._leave(server, bulkhead)
+
+        def releasing_reply(data: Union[bytes, StreamedBody], content_encoding: Optional[str]):
+            if isinstance(data, StreamedBody):
+                data.on_head = release
+            return reply(data, content_encoding)
+
+        return releasing_reply, release
+
+    @staticmethod
+    def handle_request(server, body: Dict[str, Any], reply: Callable[[bytes, Optional[str]], None], connection: Optional[Dict[str, Any]] = None, codec: Optional[Codec] = None, encoding: Optional[str] = "gzip"):
+        body = ServerUtils._unwrap_message(body)
+        deadline = ServerUtils._deadline(body)
+        priority, bulkhead = ServerUtils._scheduling(server, body)
+        # Batched calls are admitted one by one, each after its trigger's bulkhead, so every
+        # path takes its slots in the same order and a batch never holds one while waiting
+        if "batch" in body or ServerUtils._unlimited(server, bulkhead, deadline):
+            if connection is not None:
+                connection["queue_wait"] = None
+            return ServerUtils._dispatch_request(server, body, reply, connection, codec, encoding)
+
+        # Shed before any work: a full queue gets a fast "busy" reply, an expired deadline no run at all
+        queued_at = time.perf_counter()
+        shed = ServerUtils._admit(server, bulkhead, deadline, priority)
+        if connection is not None:
+            connection["queue_wait"] = time.perf_counter() - queued_at
+        if shed:
+            return reply(*ServerUtils._shed_request(server, body, shed, codec, encoding))
+
+        reply, release = ServerUtils._releasing(server, bulkhead, reply)
+        try:
+            return ServerUtils._dispatch_request(server, body, reply, connection, codec, encoding)
+        finally:
+            release()
+
+    @staticmethod
+    def _dispatch_request(server, body: Dict[str, Any], reply: Callable[[bytes, Optional[str]], None], connection: Optional[Dict[str, Any]] = None, codec: Optional[Codec] = None, encoding: Optional[str] = "gzip"):
+        if "batch" in body:
+            return ServerUtils.handle_batch(server, body, reply, connection, codec, encoding)
+
+        start = time.perf_counter()
+        codec = codec or server.codecs.default
+        trigger_name = body.get("trigger", "")
+        payload = body.get("body", {})
+        credentials = body.get("credentials", {})
+        raw = body.get("raw")
+
+        timings = connection.get("timings") if connection else None
+        if timings is not None:
+            auth_start = time.perf_counter_ns()
+        auth = ServerUtils._authenticate(server, credentials, connection)
+        if timings is not None:
+            ServerUtils._add_timing(timings, "auth", auth_start)
+        if auth.get("passed", False):
+            return reply(*ServerUtils._run_trigger(
+                server, trigger_name, payload, credentials, codec, encoding, start, connection,
+                raw if isinstance(raw, memoryview) else None,
+                # Message types as in Node: "stream" asks for a streamed reply, "subscribe" for live pushes
+                True if body.get("type") in STREAM_MESSAGE_TYPES else None,
+                body.get("type") == "subscribe"
+            ))
+
+        return reply(*ServerUtils._reject_request(server, trigger_name, payload, auth.get("message"), "auth", codec, encoding, credentials))
+
+    @staticmethod
+    async def handle_request_async(server, body: Dict[str, Any], reply: Callable[[bytes, Optional[str]], Optional[Awaitable]], connection: Optional[Dict[str, Any]] = None, codec: Optional[Codec] = None, encoding: Optional[str] = "gzip"):
+        body = ServerUtils._unwrap_message(body)
+        deadline = ServerUtils._deadline(body)
+        priority, bulkhead = ServerUtils._scheduling(server, body)
+        if "batch" in body or ServerUtils._unlimited(server, bulkhead, deadline):
+            if connection is not None:
+                connection["queue_wait"] = None
+            return await ServerUtils._dispatch_request_async(server, body, reply, connection, codec, encoding)
+
+        queued_at = time.perf_counter()
+        shed = await ServerUtils._admit_async(server, bulkhead, deadline, priority)
+        if connection is not None:
+            connection["queue_wait"] = time.perf_counter() - queued_at
+        if shed:
+            return reply(*ServerUtils._shed_request(server, body, shed, codec, encoding))
+
+        reply, release = ServerUtils._releasing(server, bulkhead, reply)
+        try:
+            return await ServerUtils._dispatch_request_async(server, body, reply, connection, codec, encoding)
+        finally:
+            release()
+
+    @staticmethod
+    async def _dispatch_request_async(server, body: Dict[str, Any], reply: Callable[[bytes, Optional[str]], Optional[Awaitable]], connection: Optional[Dict[str, Any]] = None, codec: Optional[Codec] = None, encoding: Optional[str] = "gzip"):
+        if "batch" in body:
+            return await ServerUtils.handle_batch_async(server, body, reply, connection, codec, encoding)
+
+        start = time.perf_counter()
+        codec = codec or server.codecs.default
+        trigger_name = body.get("trigger", "")
+        payload = body.get("body", {})
+        credentials = body.get("credentials", {})
+        raw = body.get("raw")
+
+        timings = connection.get("timings") if connection else None
+        if timings is not None:
+            auth_start = time.perf_counter_ns()
+        auth = ServerUtils._authenticate(server, credentials, connection)
+        if timings is not None:
+            ServerUtils._add_timing(timings, "auth", auth_start)
+        if auth.get("passed", False):
+            sent = reply(*await ServerUtils._run_trigger_async(
+                server, trigger_name, payload, credentials, codec, encoding, start, connection,
+                raw if isinstance(raw, memoryview) else None,
+                # Message types as in Node: "stream" asks for a streamed reply, "subscribe" for live pushes
+                True if body.get("type") in STREAM_MESSAGE_TYPES else None,
+                body.get("type") == "subscribe"
+            ))
+            if inspect.isawaitable(sent):
+                # A streamed reply is written as it is produced, so it stays inside admission
+                await sent
+            return
+
+        return reply(*ServerUtils._reject_request(server, trigger_name, payload, auth.get("message"), "auth", codec, encoding, credentials))
+
+    @staticmethod
+    def _handle_connection(server: Any, conn: socket.socket, options: OptionsType, context: Optional[ssl.SSLContext]):
+        keep_alive_enabled = options.get("keep_alive", False)
+        max_requests = options.get("max_keep_alive_requests", 100)
+        max_body_size = options.get("max_body_size", DEFAULT_MAX_BODY_SIZE)
+        # Set once any part of the current response is written
+        responded = False
+
+        try:
+            if context is not None:
+                try:
+                    conn = context.wrap_socket(conn, server_side=True)
+                except ssl.SSLError:
+                    # TLS handshake failed — cannot send response
+                    return
+
+            else:
                 try:
-                    conn, addr = sock.accept()
+                    first_byte = conn.recv(1, socket.MSG_PEEK)
+                    if first_byte == b"\x16":
+                        # TLS connection attempt to non-TLS server
+                        return
                 except Exception:
-                    continue
+                    return
 
+            buffer = bytearray()
+            served = 0
+            # Per-connection state shared by its requests: request count, auth cache
+            connection: Dict[str, Any] = {"requests": 0}
+            while True:
+                # Stage timings are allocated per request only when enabled
+                timings = connection["timings"] = {} if server.stage_timings else None
+                responded = False
+                if keep_alive_enabled:
+                    # Idle keep-alive connections are dropped after this many seconds
+                    conn.settimeout(options.get("keep_alive_timeout", 5))
                 try:
-                    if is_tls:
-                        try:
-                            conn = context.wrap_socket(conn, server_side=True)
-                        except ssl.SSLError:
-                            # TLS handshake failed — cannot send response
-                            conn.close()
-                            continue
-
-                    else:
-                        try:
-                            first_byte = conn.recv(1, socket.MSG_PEEK)
-                            if first_byte == b"\x16":
-                                # TLS connection attempt to non-TLS server
-                                conn.close()
-                                continue
-                        except Exception:
-                            conn.close()
-                            continue
-
-                    data = conn.recv(65536)
-                    if not data:
-                        conn.close()
-                        continue
-
-                    request_line, json_body, headers = ServerUtils._parse_http_request(
-                        data)
-                    if request_line[0] != "POST":
-                        conn.close()
-                        continue
-
-                    ServerUtils.handle_request(server, json_body or {}, lambda res: conn.send(
-                        ServerUtils._format_http_response(res))
+                    request_line, headers, body, buffer = ServerUtils._read_http_request(
+                        conn, buffer, max_body_size, timings)
+                except socket.timeout:
+                    return
+                if keep_alive_enabled:
+                    # The idle timeout is for reads only; a slow reader must not fail a stream
+                    conn.settimeout(None)
+
+                if body is None or request_line[0] != "POST":
+                    return
+
+                if timings is not None:
+                    decode_start = time.perf_counter_ns()
+                json_body, request_codec = ServerUtils._decode_request(
+                    server, headers, body)
+                if timings is not None:
+                    ServerUtils._add_timing(timings, "decode", decode_start)
+                response_codec = server.codecs.negotiate(
+                    headers.get("accept"), request_codec)
+
+                served += 1
+                connection["requests"] = served
+                connection["request_size"] = len(body)
+                keep_alive = keep_alive_enabled and served < max_requests and ServerUtils._wants_keep_alive(
+                    request_line, headers)
+                ServerUtils._record_connection_request(server, served)
+
+                def send(res: Union[bytes, StreamedBody], content_encoding: Optional[str]):
+                    nonlocal responded
+                    responded = True
+                    if isinstance(res, StreamedBody):
+                        return ServerUtils._send_stream(conn, res, keep_alive)
+                    conn.sendall(ServerUtils._format_http_response(
+                        res, keep_alive, response_codec.content_type, content_encoding))
+
+                ServerUtils.handle_request(server, json_body or {}, send,
+                    connection=connection,
+                    codec=response_codec,
+                    encoding=server.compression.negotiate(
+                        headers.get("accept-encoding"))
+                )
+
+                if not keep_alive:
+                    return
+
+        except RequestTooLargeError as e:
+            # The rest of the body is never read, so the connection cannot be reused
+            try:
+                conn.sendall(ServerUtils._format_http_response(
+                    json.dumps({"error": str(e)}).encode("utf-8")
+                ))
+            except Exception:
+                pass
+        except Exception as e:
+            if responded:
+                # Part of a response may be on the wire already; an error body would corrupt it
+                return
+            try:
+                conn.sendall(
+                    ServerUtils._format_http_response(
+                        json.dumps(
+                            {"error": f"Internal server error: {str(e)}"}
+                        ).encode("utf-8")
                     )
+                )
+            except Exception:
+                pass
+        finally:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    @staticmethod
+    async def _handle_connection_async(server: Any, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, options: OptionsType, slots: asyncio.Semaphore):
+        keep_alive_enabled = options.get("keep_alive", False)
+        keep_alive_timeout = options.get(
+            "keep_alive_timeout", 5) if keep_alive_enabled else None
+        max_requests = options.get("max_keep_alive_requests", 100)
+        max_body_size = options.get("max_body_size", DEFAULT_MAX_BODY_SIZE)
+
+        responded = False
 
-                except Exception as e:
-                    try:
-                        conn.send(
-                            ServerUtils._format_http_response(
-                                gzip.compress(json.dumps(
-                                    {"error": f"Internal server error: {str(e)}"}
-                                ).encode("utf-8"))
-                            )
-                        )
-                    except Exception:
-                        pass
-                finally:
-                    try:
-                        conn.close()
-                    except Exception:
-                        pass
+        async with slots:
+            try:
+                served = 0
+                connection: Dict[str, Any] = {"requests": 0}
+                while True:
+                    timings = connection["timings"] = {} if server.stage_timings else None
+                    responded = False
+                    request_line, headers, body = await ServerUtils._read_http_request_async(
+                        reader, max_body_size, keep_alive_timeout, timings)
+
+                    if body is None or request_line[0] != "POST":
+                        return
+
+                    if timings is not None:
+                        decode_start = time.perf_counter_ns()
+                    json_body, request_codec = ServerUtils._decode_request(
+                        server, headers, body)
+                    if timings is not None:
+                        ServerUtils._add_timing(timings, "decode", decode_start)
+                    response_codec = server.codecs.negotiate(
+                        headers.get("accept"), request_codec)
+
+                    served += 1
+                    connection["requests"] = served
+                    connection["request_size"] = len(body)
+                    keep_alive = keep_alive_enabled and served < max_requests and ServerUtils._wants_keep_alive(
+                        request_line, headers)
+                    ServerUtils._record_connection_request(server, served)
+
+                    def send(res: Union[bytes, StreamedBody], content_encoding: Optional[str]) -> Optional[Awaitable]:
+                        nonlocal responded
+                        responded = True
+                        # A streamed reply is written with awaits, so it is handed back to be awaited
+                        if isinstance(res, StreamedBody):
+                            return ServerUtils._send_stream_async(writer, res, keep_alive)
+                        writer.write(ServerUtils._format_http_response(
+                            res, keep_alive, response_codec.content_type, content_encoding))
+
+                    await ServerUtils.handle_request_async(server, json_body or {}, send,
+                        connection=connection,
+                        codec=response_codec,
+                        encoding=server.compression.negotiate(
+                            headers.get("accept-encoding"))
+                    )
+                    await writer.drain()
+
+                    if not keep_alive:
+                        return
+
+            except RequestTooLargeError as e:
+                writer.write(ServerUtils._format_http_response(
+                    json.dumps({"error": str(e)}).encode("utf-8")
+                ))
+            except Exception as e:
+                if responded:
+                    return
+                writer.write(
+                    ServerUtils._format_http_response(
+                        json.dumps(
+                            {"error": f"Internal server error: {str(e)}"}
+                        ).encode("utf-8")
+                    )
+                )
+            finally:
+                try:
+                    await writer.drain()
+                    writer.close()
+                    await writer.wait_closed()
+                except Exception:
+                    pass
+
+    @staticmethod
+    def _record_connection_request(server: Any, served: int):
+        with server._stats_lock:
+            if served == 1:
+                server.connection_stats["opened"] += 1
+            else:
+                server.connection_stats["reused"] += 1
+
+    @staticmethod
+    def _serve_simple(server: Any, sock: socket.socket, options: OptionsType, context: Optional[ssl.SSLContext]):
+        # One connection at a time: accept, handle to completion, close.
+        while True:
+            try:
+                conn, _ = sock.accept()
+            except Exception:
+                continue
+
+            ServerUtils._handle_connection(server, conn, options, context)
+
+    @staticmethod
+    def _serve_threaded(server: Any, sock: socket.socket, options: OptionsType, context: Optional[ssl.SSLContext]):
+        concurrency = options.get("concurrency", 64)
+        pool = ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="cromio-worker")
+        slots = threading.BoundedSemaphore(concurrency)
+
+        def run(conn: socket.socket):
+            try:
+                ServerUtils._handle_connection(server, conn, options, context)
+            finally:
+                slots.release()
+
+        while True:
+            # Only accept when a worker is free so that excess connections
+            # wait in the kernel backlog instead of piling up in memory.
+            slots.acquire()
+            try:
+                conn, _ = sock.accept()
+            except Exception:
+                slots.release()
+                continue
+
+            pool.submit(run, conn)
+
+    @staticmethod
+    def _serve_asyncio(server: Any, sock: socket.socket, options: OptionsType, context: Optional[ssl.SSLContext]):
+        async def main():
+            # Coroutine handlers run right here; sync ones go to the handler pool
+            server._loop = asyncio.get_running_loop()
+            slots = asyncio.Semaphore(options.get("concurrency", 64))
+
+            aio_server = await asyncio.start_server(
+                lambda reader, writer: ServerUtils._handle_connection_async(
+                    server, reader, writer, options, slots),
+                sock=sock, ssl=context, limit=MAX_HEADER_SIZE
+            )
+            async with aio_server:
+                await aio_server.serve_forever()
+
+        asyncio.run(main())
+
+    @staticmethod
+    def _serve(server: Any, sock: socket.socket, options: OptionsType, context: Optional[ssl.SSLContext]):
+        engine = options.get("engine", "simple")
+        if engine == "asyncio":
+            ServerUtils._serve_asyncio(server, sock, options, context)
+        elif engine == "threaded":
+            ServerUtils._serve_threaded(server, sock, options, context)
+        else:
+            ServerUtils._serve_simple(server, sock, options, context)
+
+    @staticmethod
+    def _run_worker(server: Any, sock: socket.socket, options: OptionsType, context: Optional[ssl.SSLContext], index: int):
+        # Runs in the forked child and never returns to the supervisor's code.
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+        exit_code = 0
+        try:
+            server.extensions.trigger_hook("on_worker_start", {
+                "server": server,
+                "worker": index
+            })
+            ServerUtils._serve(server, sock, options, context)
+        except BaseException:
+            traceback.print_exc()
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    @staticmethod
+    def _serve_workers(server: Any, sock: socket.socket, options: OptionsType, context: Optional[ssl.SSLContext]):
+        workers: Dict[int, int] = server._worker_pids
+        started: Dict[int, float] = {}
+        shutting_down = False
+
+        def spawn(index: int):
+            pid = os.fork()
+            if pid == 0:
+                ServerUtils._run_worker(server, sock, options, context, index)
+
+            workers[pid] = index
+            started[index] = time.monotonic()
+
+        def shutdown(*_):
+            nonlocal shutting_down
+            shutting_down = True
+            for pid in list(workers):
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, shutdown)
+            signal.signal(signal.SIGINT, shutdown)
+
+        for index in range(options.get("workers", 1)):
+            spawn(index)
+
+        # Supervisor loop: reap exited workers and replace the ones that crashed
+        while workers:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+
+            index = workers.pop(pid, None)
+            if index is None:
+                continue
+
+            exit_code = os.waitstatus_to_exitcode(status)
+            server.extensions.trigger_hook("on_worker_exit", {
+                "server": server,
+                "worker": index,
+                "pid": pid,
+                "exit_code": exit_code
+            })
+
+            if shutting_down:
+                continue
+
+            print(
+                f"💥 Worker {index} (pid={pid}) exited with code {exit_code}, restarting...")
+            if time.monotonic() - started[index] < 1:
+                # Back off so a worker that crashes on boot doesn't spin the CPU
+                time.sleep(1)
+
+            spawn(index)
+
+    @staticmethod
+    def start_server(server: Any, options: OptionsType, callback: Callable[[str], None]):
+        HOST, PORT = options.get("host", "0.0.0.0"), options.get("port", 2000)
+        is_tls = options.get("tls") is not None
+        engine = options.get("engine", "simple")
+
+        # The simple engine serves one connection at a time, so an idle
+        # keep-alive client would block everyone else; only pooled engines reuse.
+        options["keep_alive"] = engine != "simple" and options.get(
+            "keep_alive_timeout", 5) > 0
 
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM, 0)
         sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         sock.bind((HOST, PORT))
         sock.listen(options.get("backlog", 128))
 
+        context = None
         if is_tls:
             context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
             context.verify_mode = ssl.CERT_NONE
@@ -374,4 +1713,11 @@ class ServerUtils:
                 keyfile=options["tls"]["key"]
             )
 
-        serve(sock)
+        url = f"{'https' if is_tls else 'http'}://{HOST}:{PORT}"
+        callback(url)
+
+        if options.get("workers", 1) > 1:
+            # Pre-fork: every worker inherits the listening socket and accepts on it
+            ServerUtils._serve_workers(server, sock, options, context)
+        else:
+            ServerUtils._serve(server, sock, options, context)
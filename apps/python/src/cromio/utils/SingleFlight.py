@@ -0,0 +1,87 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class FlightCall:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+        self.followers = 0
+        # Set when the leader runs on an event loop, so followers there can await it
+        self.waiter: Optional[asyncio.Future] = None
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; concurrent callers share its outcome."""
+
+    def __init__(self):
+        self.calls: Dict[str, FlightCall] = {}
+        self.stats: Dict[str, int] = {"executed": 0, "coalesced": 0}
+        self._lock = threading.Lock()
+
+    def _join(self, key: str) -> Tuple[FlightCall, bool]:
+        with self._lock:
+            call = self.calls.get(key)
+            if call is not None:
+                call.followers += 1
+                self.stats["coalesced"] += 1
+                leader = False
+            else:
+                call = self.calls[key] = FlightCall()
+                self.stats["executed"] += 1
+                leader = True
+
+        return call, leader
+
+    def _land(self, key: str, call: FlightCall) -> None:
+        # Once the key is gone no one else can join, so the follower count is final
+        with self._lock:
+            del self.calls[key]
+        call.done.set()
+        if call.waiter is not None:
+            call.waiter.set_result(None)
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool, int]:
+        """Returns (result, shared, followers); re-raises the leader's error for every caller."""
+        call, leader = self._join(key)
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True, 0
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            self._land(key, call)
+
+        return call.result, False, call.followers
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool, int]:
+        """Awaitable form of do() for callers running on an event loop."""
+        loop = asyncio.get_running_loop()
+        call, leader = self._join(key)
+        if not leader:
+            if call.waiter is not None and call.waiter.get_loop() is loop:
+                await asyncio.shield(call.waiter)
+            else:
+                await loop.run_in_executor(None, call.done.wait)
+            if call.error is not None:
+                raise call.error
+            return call.result, True, 0
+
+        call.waiter = loop.create_future()
+        try:
+            call.result = await fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            self._land(key, call)
+
+        return call.result, False, call.followers
@@ -0,0 +1,105 @@
+import time
+import zlib
+import inspect
+from typing import Any, AsyncIterator, Callable, Iterator, Optional, Union
+from cromio.utils.Codecs import Codec
+
+
+# Output held back before a flush, unless the client subscribed to live pushes
+FLUSH_BYTES = 64 * 1024
+FLUSH_INTERVAL = 0.05
+# zlib window bits per encoding: 31 writes a gzip member, 15 a zlib stream
+STREAM_ENCODINGS = {"gzip": 31, "deflate": 15}
+
+
+def is_stream(result: Any) -> bool:
+    return inspect.isgenerator(result) or inspect.isasyncgen(result)
+
+
+class StreamedBody:
+    """A response body sent with chunked transfer encoding instead of Content-Length."""
+
+    def __init__(self, chunks: Union[Iterator[bytes], AsyncIterator[bytes]], content_type: str, content_encoding: Optional[str], abort: Optional[Callable[[], Any]] = None):
+        self.chunks = chunks
+        self.content_type = content_type
+        self.content_encoding = content_encoding
+        # Cleans up when the head could not be sent, since chunks then never started
+        self.abort = abort
+        # Called once the head is sent, to give back admission slots early
+        self.on_head: Optional[Callable[[], None]] = None
+
+
+class StreamEncoder:
+    """Frames streamed items as {"data": [...]} and compresses them incrementally.
+
+    Memory stays bounded by FLUSH_BYTES whatever the number of items; a flush
+    makes everything written so far decodable by the client straight away.
+    Output is held back by at most FLUSH_INTERVAL while more items arrive.
+    """
+
+    def __init__(self, codec: Codec, encoding: Optional[str], level: int = 6):
+        self.codec = codec
+        self.encoding = encoding if encoding in STREAM_ENCODINGS else None
+        self.compressor = zlib.compressobj(
+            level, zlib.DEFLATED, STREAM_ENCODINGS[self.encoding]) if self.encoding else None
+        self.items = 0
+        self.size = 0
+        self.opened = False
+        self._buffer = bytearray()
+        self._pending = 0
+        self._flushed_at = time.monotonic()
+
+    def _emit(self, data: bytes, flush: bool = False) -> bytes:
+        if self.compressor is not None:
+            self._buffer += self.compressor.compress(data)
+        else:
+            self._buffer += data
+
+        self._pending += len(data)
+        if not flush and self._pending < FLUSH_BYTES and time.monotonic() - self._flushed_at < FLUSH_INTERVAL:
+            return b""
+
+        if self.compressor is not None:
+            self._buffer += self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+        out = bytes(self._buffer)
+        self._buffer.clear()
+        self._pending = 0
+        self._flushed_at = time.monotonic()
+        self.size += len(out)
+        return out
+
+    def open(self) -> bytes:
+        self.opened = True
+        return self._emit(b'{"data":[')
+
+    def item(self, value: Any, flush: bool = False) -> bytes:
+        data = self.codec.encode(value)
+        if self.items:
+            data = b"," + data
+        self.items += 1
+        return self._emit(data, flush)
+
+    def value(self, value: Any) -> bytes:
+        # Non-iterable results are framed as a single {"data": value}
+        data = b'{"data":' + self.codec.encode(value)
+        self.opened = True
+        return self._emit(data)
+
+    def close(self, error: Optional[Exception] = None, array: bool = True) -> bytes:
+        if not self.opened:
+            tail = b'{"data":null'
+        else:
+            tail = b"]" if array else b""
+        if error is not None:
+            # Headers are long gone, so a failure mid-stream is reported in the trailer
+            tail += b',"error":' + self.codec.encode(str(error))
+
+        out = self._emit(tail + b"}", flush=self.compressor is None)
+        if self.compressor is not None:
+            final = bytes(self._buffer) + self.compressor.flush(zlib.Z_FINISH)
+            self._buffer.clear()
+            self.size += len(final)
+            out += final
+
+        return out
@@ -1,20 +1,24 @@
-from typing import Callable, Dict
+from typing import Callable, Dict, Optional
 
 import pydantic
+from cromio.constants import DEFAULT_PRIORITY
+from cromio.typing import CacheType
 
 
 class TriggerDefinition:
     def __init__(self):
         self.triggers: Dict[str, list[Callable]] = {}
 
-    def __call__(self, name: str, schema: pydantic.BaseModel = None):
+    def __call__(self, name: str, schema: pydantic.BaseModel = None, cache: Optional[CacheType] = None, coalesce: bool = False, priority: str = DEFAULT_PRIORITY, max_concurrency: Optional[int] = None):
         # Makes the instance itself callable like a decorator
-        return self.trigger(name, schema)
+        return self.trigger(name, schema, cache, coalesce, priority, max_concurrency)
 
-    def trigger(self, name: str, schema: pydantic.BaseModel = None):
+    def trigger(self, name: str, schema: pydantic.BaseModel = None, cache: Optional[CacheType] = None, coalesce: bool = False, priority: str = DEFAULT_PRIORITY, max_concurrency: Optional[int] = None):
         """Decorator to register a trigger by name."""
         def decorator(func: Callable):
-            self.triggers[name] = [func, schema]
+            self.triggers[name] = [
+                func, schema, {"cache": cache, "coalesce": coalesce,
+                               "priority": priority, "max_concurrency": max_concurrency}]
             return func
         
         return decorator
@@ -0,0 +1,133 @@
+import os
+import sys
+import asyncio
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from cromio import Server  # noqa: E402
+from cromio.utils import Utils  # noqa: E402
+
+
+CREDENTIALS = {"language": "python", "ip": "127.0.0.1"}
+
+
+def make_server(started: threading.Event, release: threading.Event) -> Server:
+    server = Server(admission={"max_in_flight": 1})
+
+    @server.on_trigger("x", max_concurrency=1)
+    def x(ctx):
+        started.set()
+        release.wait(5)
+        return "done"
+
+    return server
+
+
+def single(trigger: str = "x") -> dict:
+    return {"trigger": trigger, "body": {}, "credentials": CREDENTIALS}
+
+
+def batch(trigger: str = "x") -> dict:
+    return {"batch": [{"trigger": trigger, "body": {}}], "credentials": CREDENTIALS}
+
+
+def test_single_call_and_batch_do_not_deadlock():
+    started, release = threading.Event(), threading.Event()
+    server = make_server(started, release)
+    replies = []
+
+    def run(body):
+        Utils.handle_request(server, body, lambda data, encoding: replies.append(data),
+                             encoding=None)
+
+    # The first call holds both the trigger's slot and the server-wide one
+    threads = [threading.Thread(target=run, args=(single(),), daemon=True)]
+    threads[0].start()
+    assert started.wait(5)
+
+    threads += [threading.Thread(target=run, args=(single(),), daemon=True),
+                threading.Thread(target=run, args=(batch(),), daemon=True)]
+    for thread in threads[1:]:
+        thread.start()
+
+    release.set()
+    for thread in threads:
+        thread.join(5)
+        assert not thread.is_alive()
+
+    assert len(replies) == 3
+    assert all(b"done" in data for data in replies)
+    assert server.admission.in_flight == 0
+    assert server.bulkheads["x"].in_flight == 0
+
+
+def test_single_call_and_batch_do_not_deadlock_async():
+    started, release = threading.Event(), threading.Event()
+    server = make_server(started, release)
+    replies = []
+
+    async def main():
+        async def run(body):
+            await Utils.handle_request_async(server, body, lambda data, encoding: replies.append(data),
+                                             encoding=None)
+
+        first = asyncio.create_task(run(single()))
+        assert await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        rest = [asyncio.create_task(run(single())), asyncio.create_task(run(batch()))]
+        await asyncio.sleep(0.05)
+
+        release.set()
+        await asyncio.wait_for(asyncio.gather(first, *rest), 5)
+
+    asyncio.run(main())
+
+    assert len(replies) == 3
+    assert all(b"done" in data for data in replies)
+    assert server.admission.in_flight == 0
+    assert server.bulkheads["x"].in_flight == 0
+
+
+def test_cancelled_admission_releases_the_bulkhead():
+    server = Server(admission={"max_in_flight": 1})
+    server.on_trigger("y", lambda ctx: "y", max_concurrency=1)
+
+    async def main():
+        # Another request holds the only server-wide slot, so "y" queues there after its bulkhead
+        assert await server.admission.acquire_async() is None
+        waiting = asyncio.create_task(Utils._admit_async(server, server.bulkheads["y"], None, "normal"))
+        await asyncio.sleep(0.05)
+        assert server.bulkheads["y"].in_flight == 1
+
+        waiting.cancel()
+        try:
+            await waiting
+        except asyncio.CancelledError:
+            pass
+        server.admission.release()
+
+    asyncio.run(main())
+
+    assert server.bulkheads["y"].in_flight == 0
+    assert server.admission.in_flight == 0
+    assert server.admission.queue_depth == 0
+
+
+
+def test_stream_gives_back_its_slots_once_the_head_is_sent():
+    server = Server(admission={"max_in_flight": 1})
+    server.on_trigger("numbers", lambda ctx: iter(range(3)), max_concurrency=1)
+    held = []
+
+    def reply(stream, encoding):
+        held.append((server.admission.in_flight, server.bulkheads["numbers"].in_flight))
+        stream.on_head()
+        held.append((server.admission.in_flight, server.bulkheads["numbers"].in_flight))
+        b"".join(stream.chunks)
+
+    Utils.handle_request(server, {**single("numbers"), "type": "stream"}, reply, encoding=None)
+
+    assert held == [(1, 1), (0, 0)]
+    # Released once only, although the request ends after the head
+    assert server.admission.in_flight == 0
+    assert server.bulkheads["numbers"].in_flight == 0
@@ -0,0 +1,157 @@
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from cromio import Server  # noqa: E402
+from cromio.utils import Utils  # noqa: E402
+
+
+OPTIONS = {"keep_alive": True, "keep_alive_timeout": 2, "max_keep_alive_requests": 100, "max_body_size": 1024}
+CREDENTIALS = {"language": "python", "ip": "127.0.0.1"}
+
+
+def make_server() -> Server:
+    server = Server()
+    server.on_trigger("echo", lambda ctx: ctx["body"].get("value"))
+
+    @server.on_trigger("count")
+    def count(ctx):
+        for i in range(3):
+            yield i
+
+    @server.on_trigger("large")
+    def large(ctx):
+        for _ in range(64):
+            yield "x" * 65536
+
+    return server
+
+
+def request(trigger: str, body: dict, close: bool = False, **envelope) -> bytes:
+    payload = json.dumps({"trigger": trigger, "body": body, "credentials": CREDENTIALS, **envelope}).encode()
+    return (
+        b"POST / HTTP/1.1\r\n"
+        b"Host: localhost\r\n"
+        b"Accept-Encoding: identity\r\n"
+        b"Content-Type: application/json\r\n"
+        b"Content-Length: %d\r\n"
+        b"Connection: %b\r\n"
+        b"\r\n%b"
+    ) % (len(payload), b"close" if close else b"keep-alive", payload)
+
+
+def serve_connection(server: Server, engine: str, client_data: bytes, shutdown: bool = False, read_delay: float = 0, **options) -> bytes:
+    """Sends client_data over one connection and returns everything the server wrote back."""
+    client, peer = socket.socketpair()
+    options = {**OPTIONS, **options}
+
+    def handle():
+        if engine == "threaded":
+            Utils._handle_connection(server, peer, options, None)
+            return
+
+        async def main():
+            reader, writer = await asyncio.open_connection(sock=peer)
+            await Utils._handle_connection_async(server, reader, writer, options, asyncio.Semaphore(1))
+
+        asyncio.run(main())
+
+    thread = threading.Thread(target=handle, daemon=True)
+    thread.start()
+    client.sendall(client_data)
+    if shutdown:
+        client.shutdown(socket.SHUT_WR)
+
+    time.sleep(read_delay)
+    client.settimeout(5)
+    received = bytearray()
+    while chunk := client.recv(65536):
+        received += chunk
+    client.close()
+
+    thread.join(5)
+    assert not thread.is_alive()
+    return bytes(received)
+
+
+def responses(data: bytes) -> list:
+    """Splits Content-Length framed responses and returns their bodies."""
+    bodies = []
+    while data:
+        head, _, rest = data.partition(b"\r\n\r\n")
+        length = int(next(line.split(b":")[1] for line in head.split(b"\r\n")
+                          if line.lower().startswith(b"content-length")))
+        bodies.append(json.loads(rest[:length]))
+        data = rest[length:]
+
+    return bodies
+
+
+@pytest.mark.parametrize("engine", ["threaded", "asyncio"])
+def test_pipelined_requests_are_answered_in_order(engine):
+    data = request("echo", {"value": 1}) + request("echo", {"value": 2}) + request("echo", {"value": 3}, close=True)
+
+    assert responses(serve_connection(make_server(), engine, data)) == [
+        {"data": 1}, {"data": 2}, {"data": 3}]
+
+
+@pytest.mark.parametrize("engine", ["threaded", "asyncio"])
+def test_truncated_body_gets_no_response(engine):
+    data = request("echo", {"value": 1}, close=True)
+
+    assert serve_connection(make_server(), engine, data[:-5], shutdown=True) == b""
+
+
+@pytest.mark.parametrize("engine", ["threaded", "asyncio"])
+def test_oversized_body_is_refused(engine):
+    data = request("echo", {"value": "x" * 2048}, close=True)
+
+    [body] = responses(serve_connection(make_server(), engine, data))
+    assert "exceeds max_body_size" in body["error"]
+
+
+def dechunk(data: bytes) -> tuple:
+    """Decodes a chunked response; returns its head, body and whatever follows the terminator."""
+    head, _, chunks = data.partition(b"\r\n\r\n")
+    assert b"Transfer-Encoding: chunked" in head
+
+    # Chunks are hex length, CRLF, data, CRLF, up to the zero-length terminator
+    body = b""
+    while True:
+        size, _, chunks = chunks.partition(b"\r\n")
+        if int(size, 16) == 0:
+            break
+        body += chunks[:int(size, 16)]
+        chunks = chunks[int(size, 16) + 2:]
+
+    assert chunks.startswith(b"\r\n")
+    return head, body, chunks[2:]
+
+
+@pytest.mark.parametrize("engine", ["threaded", "asyncio"])
+def test_stream_ends_with_terminating_chunk_and_connection_is_reused(engine):
+    data = request("count", {}, type="stream") + request("echo", {"value": "after"}, close=True)
+    _, body, rest = dechunk(serve_connection(make_server(), engine, data))
+
+    assert json.loads(body) == {"data": [0, 1, 2]}
+    # The next response follows the terminator on the same connection
+    assert responses(rest) == [{"data": "after"}]
+
+
+@pytest.mark.parametrize("engine", ["threaded", "asyncio"])
+def test_slow_reader_does_not_hit_the_idle_timeout(engine):
+    data = request("large", {}, close=True, type="stream")
+    # The stream outgrows the socket buffers while the client waits past the idle timeout
+    _, body, rest = dechunk(serve_connection(
+        make_server(), engine, data, read_delay=0.5, keep_alive_timeout=0.2))
+
+    assert len(json.loads(body)["data"]) == 64
+    assert rest == b""
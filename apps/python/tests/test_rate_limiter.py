@@ -0,0 +1,96 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from cromio.extensions.utils import RequestRejectedError  # noqa: E402
+from cromio.extensions.builtin.rateLimiter import RequestRateLimiter  # noqa: E402
+from cromio.extensions.builtin.rateLimiter.buckets import SharedBucketTable  # noqa: E402
+
+
+def put(value: float, touched: float):
+    # Stores (value, touched) and returns the state found before
+    return lambda state: ((value, touched), state)
+
+
+def same_home(table: SharedBucketTable, count: int) -> list:
+    homes = {}
+    for i in range(10000):
+        key = f"client-{i}"
+        keys = homes.setdefault(SharedBucketTable.hash(key) % table.slots, [])
+        keys.append(key)
+        if len(keys) == count:
+            return keys
+
+    raise AssertionError("no keys sharing a home slot")
+
+
+def test_keys_sharing_a_home_slot_keep_their_own_state():
+    table = SharedBucketTable(slots=64, shards=1)
+    first, second = same_home(table, 2)
+
+    assert table.update(first, put(1, 100), stale_before=0) is None
+    assert table.update(second, put(2, 100), stale_before=0) is None
+
+    assert table.update(first, put(1, 100), stale_before=0) == (1, 100)
+    assert table.update(second, put(2, 100), stale_before=0) == (2, 100)
+    assert table.stats["evictions"] == 0
+
+
+def test_expired_slots_are_reused_without_eviction():
+    # A single region of PROBES slots: every key probes all of them
+    table = SharedBucketTable(slots=SharedBucketTable.PROBES, shards=1)
+    for i in range(table.slots):
+        table.update(f"old-{i}", put(i, 100), stale_before=0)
+
+    assert table.update("new", put(1, 300), stale_before=200) is None
+    assert table.update("new", put(1, 300), stale_before=200) == (1, 300)
+    assert table.stats["evictions"] == 0
+
+
+def test_full_probe_window_evicts_the_least_recently_touched_key():
+    table = SharedBucketTable(slots=SharedBucketTable.PROBES, shards=1)
+    for i in range(table.slots):
+        table.update(f"live-{i}", put(i, 100 + i), stale_before=0)
+
+    table.update("new", put(1, 200), stale_before=0)
+    assert table.stats["evictions"] == 1
+
+    # Every other key is still there; live-0 was the oldest and starts over
+    for i in range(1, table.slots):
+        assert table.update(f"live-{i}", put(i, 100 + i), stale_before=0) == (i, 100 + i)
+    assert table.update("live-0", put(0, 300), stale_before=0) is None
+    assert table.stats["evictions"] == 2
+
+
+def admit_context(ip: str = "10.0.0.1", trigger: str = "x") -> dict:
+    return {"request": {"trigger": trigger, "body": {}, "client": {"ip": ip}}, "credentials": {}}
+
+
+@pytest.mark.parametrize("algorithm", ["token_bucket", "gcra"])
+def test_exactly_limit_calls_are_admitted(algorithm):
+    limiter = RequestRateLimiter(limit=3, interval=60000, slots=64, algorithm=algorithm)
+
+    for _ in range(3):
+        limiter.on_request_admit(admit_context())
+
+    with pytest.raises(RequestRejectedError):
+        limiter.on_request_admit(admit_context())
+
+    # Other clients have buckets of their own
+    limiter.on_request_admit(admit_context(ip="10.0.0.2"))
+
+
+@pytest.mark.parametrize("algorithm", ["token_bucket", "gcra"])
+def test_exactly_trigger_limit_calls_are_admitted(algorithm):
+    limiter = RequestRateLimiter(limit=100, interval=60000, trigger_limits={"x": 2}, slots=64, algorithm=algorithm)
+
+    for _ in range(2):
+        limiter.on_request_admit(admit_context())
+
+    with pytest.raises(RequestRejectedError, match="trigger 'x'"):
+        limiter.on_request_admit(admit_context())
+
+    limiter.on_request_admit(admit_context(trigger="y"))